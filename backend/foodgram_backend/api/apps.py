@@ -4,3 +4,28 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import (m2m_changed, post_delete,
+                                              post_save)
+
+        from recipes.models import (Favorites, Ingredients, Recipes,
+                                    RecipesTags, ShoppingList)
+        from users.models import Follow, User
+        from .middleware import install_query_observers
+        from .utils.counts import bump_count_version
+        from .utils.ingredients_index import ingredients_index
+
+        connection_created.connect(install_query_observers)
+
+        post_save.connect(ingredients_index.invalidate, sender=Ingredients)
+        post_delete.connect(ingredients_index.invalidate, sender=Ingredients)
+
+        for model in (Recipes, RecipesTags, Favorites, ShoppingList,
+                      User, Follow):
+            post_save.connect(bump_count_version, sender=model)
+            post_delete.connect(bump_count_version, sender=model)
+        m2m_changed.connect(
+            lambda sender, **kwargs: bump_count_version(RecipesTags),
+            sender=RecipesTags, weak=False)
@@ -1,7 +1,14 @@
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramWordSimilarity)
+from django.db.models import Exists, F, OuterRef, Q
+from django.forms import TypedMultipleChoiceField
 from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
 
-from recipes.models import Ingredients, Recipes, Tags
-from users.models import User
+from recipes.models import (Favorites, Ingredients, Recipes, RecipesTags,
+                            ShoppingList)
+from .pagination import is_keyset_request
 
 
 class IngredientsFilter(filters.FilterSet):
@@ -14,37 +21,78 @@ class IngredientsFilter(filters.FilterSet):
         fields = ['name']
 
 
+class AnyValueMultipleField(TypedMultipleChoiceField):
+    """Поле для нескольких значений без списка допустимых вариантов."""
+    def valid_value(self, value):
+        return True
+
+
+class AnyValueMultipleFilter(filters.TypedMultipleChoiceFilter):
+    """Фильтр по нескольким значениям одного параметра:
+    ?tags=lunch&tags=dinner."""
+    field_class = AnyValueMultipleField
+
+
 class RecipesFilter(filters.FilterSet):
     """Определяет фильтры для рецептов:
-    по тегам, автору, по избранному, по списку покупок."""
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tags.objects.all()
-    )
-    author = filters.ModelChoiceFilter(
-        field_name='author_id',
-        queryset=User.objects.all()
-    )
-    is_favorited = filters.BooleanFilter(
-        field_name='favorite_recipes',
-        method='filter_favorites'
-    )
+    по тегам, авторам, времени приготовления, по избранному,
+    по списку покупок и полнотекстовый поиск по названию и описанию.
+    Фильтры по связанным таблицам выполняются подзапросами EXISTS,
+    поэтому рецепты не дублируются и не требуют DISTINCT."""
+    tags = AnyValueMultipleFilter(method='filter_tags')
+    author = AnyValueMultipleFilter(method='filter_author', coerce=int)
+    cooking_time = filters.RangeFilter()
+    is_favorited = filters.BooleanFilter(method='filter_favorites')
     is_in_shopping_cart = filters.BooleanFilter(
-        field_name='shopping_cart',
-        method='filter_shopping_cart'
-    )
+        method='filter_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipes
-        fields = ('tags', 'author')
-        # 'is_favorited', 'is_in_shopping_cart'
+        fields = ('tags', 'author', 'cooking_time')
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(Exists(RecipesTags.objects.filter(
+            recipe_id=OuterRef('pk'), tag_id__slug__in=value)))
+
+    def filter_author(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(author_id__in=value)
 
     def filter_favorites(self, queryset, name, value):
-        return (queryset.filter(
-            in_favorites__user=self.request.user) if (
-            value and self.request.user.is_authenticated) else queryset)
+        if not (value and self.request.user.is_authenticated):
+            return queryset
+        return queryset.filter(Exists(Favorites.objects.filter(
+            user=self.request.user, recipe_id=OuterRef('pk'))))
 
     def filter_shopping_cart(self, queryset, name, value):
+        if not (value and self.request.user.is_authenticated):
+            return queryset
+        return queryset.filter(Exists(ShoppingList.objects.filter(
+            user=self.request.user, recipe_id=OuterRef('pk'))))
+
+    def filter_search(self, queryset, name, value):
+        """Ищет по поисковому вектору рецепта, а для опечаток -
+        по триграммному сходству названия. Результаты упорядочены
+        по релевантности, поэтому с пагинацией по ключу (pub_date, id)
+        поиск не сочетается."""
+        if is_keyset_request(self.request):
+            raise ValidationError({'search': [
+                'Поиск не поддерживает ?pagination=cursor, '
+                'используйте page/limit.']})
+        query = SearchQuery(
+            value,
+            config=settings.RECIPES_SEARCH_CONFIG,
+            search_type='websearch',
+        )
         return queryset.filter(
-            in_shopping_cart__user=self.request.user) if value else queryset
+            Q(search_vector=query) | Q(name__trigram_word_similar=value)
+        ).annotate(
+            rank=SearchRank(F('search_vector'), query),
+            similarity=TrigramWordSimilarity(value, 'name'),
+        ).order_by(
+            # Рецепт без поискового вектора найден только по сходству.
+            F('rank').desc(nulls_last=True), '-similarity', '-pub_date')
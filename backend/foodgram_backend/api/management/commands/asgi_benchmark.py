@@ -0,0 +1,292 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .loadtest import Connection, Stats
+
+SERVERS = {
+    'wsgi': ('foodgram_backend.wsgi', []),
+    'asgi': (
+        'foodgram_backend.asgi',
+        ['--worker-class', 'uvicorn.workers.UvicornWorker'],
+    ),
+}
+
+
+class LatencyProxy:
+    """TCP-прокси к базе данных, который доставляет ответы базы
+    с задержкой: так локальная база ведет себя как удаленная.
+    Работает в отдельном потоке со своим циклом событий."""
+
+    def __init__(self, host, port, delay):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(
+            asyncio.start_server(self.handle, '127.0.0.1', 0))
+        self.address = self.server.sockets[0].getsockname()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    async def handle(self, client_reader, client_writer):
+        try:
+            server_reader, server_writer = await asyncio.open_connection(
+                self.host, self.port)
+        except OSError:
+            client_writer.close()
+            return
+        await asyncio.gather(
+            self.pipe(client_reader, server_writer, 0),
+            self.pipe(server_reader, client_writer, self.delay),
+        )
+
+    async def pipe(self, reader, writer, delay):
+        """Пересылает данные в исходном порядке, каждый фрагмент -
+        не раньше чем через delay секунд после получения."""
+        queue = asyncio.Queue()
+
+        async def send():
+            while True:
+                deliver_at, data = await queue.get()
+                if not data:
+                    break
+                await asyncio.sleep(max(deliver_at - time.monotonic(), 0))
+                writer.write(data)
+                await writer.drain()
+            writer.close()
+
+        sender = asyncio.ensure_future(send())
+        try:
+            while True:
+                data = await reader.read(65536)
+                queue.put_nowait((time.monotonic() + delay, data))
+                if not data:
+                    break
+        except OSError:
+            queue.put_nowait((0, b''))
+        try:
+            await sender
+        except OSError:
+            pass
+
+
+class Command(BaseCommand):
+    """Сравнение синхронного (gunicorn, WSGI) и асинхронного
+    (gunicorn с UvicornWorker, ASGI, ASYNC_VIEWS = True) сервера на
+    чтении ленты, рецепта, тегов и ингредиентов.
+
+    Для каждого сервера запускается заданное число процессов, затем
+    нагрузка с растущим числом клиентов. Параллельность - сколько
+    запросов процесс обслуживает одновременно: пропускная способность
+    на процесс, умноженная на время ответа при одном клиенте. Задержка
+    --db-latency имитирует удаленную базу: без нее локальная база
+    отвечает быстрее, чем сериализуется ответ."""
+    help = 'Параллельность на процесс: WSGI против ASGI.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--servers', default='wsgi,asgi',
+            help='Серверы через запятую: wsgi, asgi.')
+        parser.add_argument(
+            '--clients', default='1,4,16,32',
+            help='Число параллельных клиентов для каждого замера.')
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Длительность одного замера в секундах.')
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument(
+            '--db-latency', type=float, default=5,
+            help='Задержка ответов базы в миллисекундах.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--output', type=Path, help='Файл JSON-отчета.')
+
+    def handle(self, *args, **options):
+        servers = options['servers'].split(',')
+        for name in servers:
+            if name not in SERVERS:
+                raise CommandError(
+                    f'Неизвестный сервер {name}, доступны: '
+                    f'{", ".join(SERVERS)}.')
+        try:
+            clients = sorted({1, *(
+                int(value) for value in options['clients'].split(','))})
+        except ValueError:
+            raise CommandError('--clients: ожидаются целые числа.')
+        self.duration = options['duration']
+        self.workers = options['workers']
+        self.rng = random.Random(options['seed'])
+
+        database = settings.DATABASES['default']
+        if options['db_latency'] > 0 and not database['HOST']:
+            raise CommandError(
+                'Для --db-latency нужно подключение к базе по TCP '
+                '(DB_HOST).')
+
+        results = []
+        for name in servers:
+            proxy = nullcontext()
+            if options['db_latency'] > 0:
+                proxy = LatencyProxy(
+                    database['HOST'], int(database['PORT']),
+                    options['db_latency'] / 1000)
+            with proxy:
+                results.extend(self.benchmark(name, proxy, clients))
+
+        self.write_report(results)
+        if options['output']:
+            options['output'].write_text(json.dumps({
+                'workers': self.workers,
+                'db_latency_ms': options['db_latency'],
+                'results': results,
+            }, ensure_ascii=False, indent=2))
+
+    def benchmark(self, name, proxy, clients):
+        port = self.get_free_port()
+        server = self.start_server(name, port, proxy)
+        try:
+            asyncio.run(self.wait_ready(port, server))
+            self.stdout.write(f'{name}: сервер запущен на порту {port}.')
+            results = []
+            for count in clients:
+                stats, duration = asyncio.run(self.run(port, count))
+                summary = stats.summary(duration)
+                if count == 1:
+                    base_latency = summary['mean_ms'] / 1000
+                summary['concurrency'] = round(
+                    summary['rps'] / self.workers * base_latency, 1)
+                results.append({'server': name, 'clients': count, **summary})
+            return results
+        finally:
+            server.terminate()
+            server.wait()
+
+    @staticmethod
+    def get_free_port():
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    def start_server(self, name, port, proxy):
+        app, arguments = SERVERS[name]
+        env = {**os.environ, 'ASYNC_VIEWS': str(name == 'asgi')}
+        if isinstance(proxy, LatencyProxy):
+            env['DB_HOST'], env['DB_PORT'] = proxy.address[0], str(
+                proxy.address[1])
+        env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+        return subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn',
+             '--workers', str(self.workers),
+             '--bind', f'127.0.0.1:{port}',
+             '--log-level', 'warning',
+             *arguments, app],
+            cwd=settings.BASE_DIR,
+            env=env,
+        )
+
+    async def wait_ready(self, port, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('Сервер завершился при запуске.')
+            connection = Connection('127.0.0.1', port)
+            try:
+                status, content = await connection.request(
+                    'GET', '/api/tags/')
+            except (OSError, asyncio.IncompleteReadError):
+                await asyncio.sleep(0.2)
+                continue
+            finally:
+                await connection.close()
+            if status != 200:
+                raise CommandError(f'/api/tags/: ответ {status}.')
+            self.tags = [tag['slug'] for tag in json.loads(content)]
+            return
+        raise CommandError('Сервер не запустился.')
+
+    def get_path(self):
+        """Чтение, как в ленте: страница рецептов с тегами, рецепт,
+        теги, автодополнение ингредиента."""
+        kind = self.rng.choices(
+            ('list', 'detail', 'tags', 'ingredients'), (4, 4, 1, 1))[0]
+        if kind == 'list':
+            tags = self.rng.sample(
+                self.tags, self.rng.randint(0, len(self.tags)))
+            return 'GET /api/recipes/', (
+                f'/api/recipes/?page={self.rng.randint(1, 5)}&limit=6'
+                + ''.join(f'&tags={tag}' for tag in tags))
+        if kind == 'detail':
+            return 'GET /api/recipes/{id}/', (
+                f'/api/recipes/{self.rng.choice(self.recipes)}/')
+        if kind == 'tags':
+            return 'GET /api/tags/', '/api/tags/'
+        return 'GET /api/ingredients/', (
+            f'/api/ingredients/?name={quote(self.rng.choice("абвгкмпс"))}')
+
+    async def client(self, port, stats, deadline):
+        connection = Connection('127.0.0.1', port)
+        while time.monotonic() < deadline:
+            name, path = self.get_path()
+            started = time.perf_counter()
+            try:
+                status, _ = await connection.request('GET', path)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                await connection.close()
+                status = None
+            stats.add(name, time.perf_counter() - started, status != 200)
+        await connection.close()
+
+    async def run(self, port, clients):
+        if not hasattr(self, 'recipes'):
+            connection = Connection('127.0.0.1', port)
+            status, content = await connection.request(
+                'GET', '/api/recipes/?limit=100')
+            await connection.close()
+            if status != 200:
+                raise CommandError(f'/api/recipes/: ответ {status}.')
+            self.recipes = [
+                recipe['id'] for recipe in json.loads(content)['results']]
+            if not self.recipes:
+                raise CommandError(
+                    'Нет рецептов, заполните базу командой '
+                    'generate_dataset.')
+        stats = Stats()
+        started = time.monotonic()
+        await asyncio.gather(*(
+            self.client(port, stats, started + self.duration)
+            for _ in range(clients)))
+        return stats, time.monotonic() - started
+
+    def write_report(self, results):
+        self.stdout.write(
+            f'{"сервер":<8}{"клиенты":>9}{"rps":>9}{"p50":>8}{"p95":>8}'
+            f'{"p99":>8}{"ошибки":>9}{"параллельность":>16}')
+        for item in results:
+            self.stdout.write(
+                f'{item["server"]:<8}{item["clients"]:>9}{item["rps"]:>9}'
+                f'{item["p50_ms"]:>8}{item["p95_ms"]:>8}{item["p99_ms"]:>8}'
+                f'{item["error_rate"]:>9.2%}{item["concurrency"]:>16}')
+        self.stdout.write(self.style.SUCCESS(
+            'Параллельность - запросов одновременно на один процесс '
+            f'(процессов: {self.workers}).'))
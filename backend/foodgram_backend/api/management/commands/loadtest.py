@@ -0,0 +1,375 @@
+import asyncio
+import json
+import math
+import random
+import time
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Сценарий -> вес по умолчанию.
+DEFAULT_MIX = {
+    'browse': 60,
+    'favorite': 15,
+    'cart': 10,
+    'download': 5,
+    'follow': 10,
+}
+
+
+class HTTPError(Exception):
+    pass
+
+
+class Connection:
+    """Минимальный клиент HTTP/1.1 на asyncio с keep-alive.
+    Поддерживает ответы с Content-Length, chunked и до закрытия
+    соединения (runserver)."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=None):
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(
+                    self.host, self.port)
+            try:
+                return await self._request(method, path, headers, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Сервер закрыл соединение keep-alive: переподключаемся.
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _request(self, method, path, headers, body):
+        headers = {
+            'Host': f'{self.host}:{self.port}',
+            'Accept': 'application/json, */*;q=0.8',
+            'Connection': 'keep-alive',
+            **(headers or {}),
+        }
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        headers['Content-Length'] = str(len(body or b''))
+        head = f'{method} {path} HTTP/1.1\r\n' + ''.join(
+            f'{name}: {value}\r\n' for name, value in headers.items())
+        self.writer.write(head.encode('latin-1') + b'\r\n' + (body or b''))
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in response_headers:
+            content = await self.reader.readexactly(
+                int(response_headers['content-length']))
+        elif response_headers.get('transfer-encoding') == 'chunked':
+            content = await self._read_chunked()
+        else:
+            content = await self.reader.read()
+            await self.close()
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, content
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0],
+                       16)
+            if not size:
+                await self.reader.readuntil(b'\r\n')
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readexactly(2)
+
+
+class Stats:
+    """Задержки, коды ответов и ошибки по эндпоинтам."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, name, latency, error):
+        self.latencies[name].append(latency)
+        if error:
+            self.errors[name] += 1
+
+    @staticmethod
+    def percentile(values, percent):
+        index = max(math.ceil(len(values) * percent / 100) - 1, 0)
+        return values[index]
+
+    def describe(self, values, errors, duration):
+        values = sorted(values)
+        return {
+            'requests': len(values),
+            'rps': round(len(values) / duration, 1),
+            'errors': errors,
+            'error_rate': round(errors / len(values), 4),
+            'mean_ms': round(sum(values) / len(values) * 1000, 1),
+            **{
+                f'p{percent}_ms': round(
+                    self.percentile(values, percent) * 1000, 1)
+                for percent in (50, 95, 99)
+            },
+        }
+
+    def report(self, duration):
+        return {
+            name: self.describe(
+                self.latencies[name], self.errors[name], duration)
+            for name in sorted(self.latencies)
+        }
+
+    def summary(self, duration):
+        """Те же показатели по всем эндпоинтам вместе."""
+        return self.describe(
+            [value for values in self.latencies.values() for value in values],
+            sum(self.errors.values()),
+            duration,
+        )
+
+
+class VirtualUser:
+    """Пользователь со своим соединением, токеном и генератором
+    случайных чисел."""
+
+    def __init__(self, command, number):
+        self.command = command
+        self.stats = command.stats
+        self.rng = random.Random(command.seed + number)
+        self.connection = Connection(command.host, command.port)
+        self.email = f'{command.prefix}_{number}@example.com'
+        self.token = None
+
+    async def call(self, name, method, path, expected=(200,), body=None):
+        headers = {}
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        started = time.perf_counter()
+        try:
+            status, content = await self.connection.request(
+                method, path, headers, body)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            await self.connection.close()
+            status, content = None, b''
+        self.stats.add(
+            name, time.perf_counter() - started, status not in expected)
+        return status, content
+
+    async def login(self):
+        status, content = await self.connection.request(
+            'POST', '/api/auth/token/login/',
+            body={'email': self.email, 'password': self.command.password})
+        if status != 200:
+            raise HTTPError(
+                f'Не удалось войти как {self.email}: ответ {status}.')
+        self.token = json.loads(content)['auth_token']
+
+    async def run(self, deadline):
+        scenarios = list(self.command.mix)
+        weights = list(self.command.mix.values())
+        while time.monotonic() < deadline:
+            scenario = self.rng.choices(scenarios, weights)[0]
+            await getattr(self, f'scenario_{scenario}')()
+            if self.command.think_time:
+                await asyncio.sleep(
+                    self.rng.expovariate(1 / self.command.think_time))
+        await self.connection.close()
+
+    async def scenario_browse(self):
+        """Лента с фильтром по тегам, затем один рецепт."""
+        tags = self.rng.sample(
+            self.command.tags, self.rng.randint(0, len(self.command.tags)))
+        query = urlencode(
+            [('page', self.rng.randint(1, 5)), ('limit', 6)]
+            + [('tags', tag) for tag in tags])
+        status, content = await self.call(
+            'GET /api/recipes/', 'GET', f'/api/recipes/?{query}')
+        if status == 200:
+            results = json.loads(content)['results']
+            if results:
+                recipe = self.rng.choice(results)
+                await self.call(
+                    'GET /api/recipes/{id}/', 'GET',
+                    f'/api/recipes/{recipe["id"]}/')
+
+    async def toggle(self, action):
+        """Добавляет рецепт в избранное или корзину, а если он уже
+        там (ответ 400), удаляет."""
+        recipe_id = self.rng.choice(self.command.recipes)
+        path = f'/api/recipes/{recipe_id}/{action}/'
+        status, _ = await self.call(
+            f'POST /api/recipes/{{id}}/{action}/', 'POST', path,
+            expected=(201, 400))
+        if status == 400:
+            await self.call(
+                f'DELETE /api/recipes/{{id}}/{action}/', 'DELETE', path,
+                expected=(204,))
+
+    async def scenario_favorite(self):
+        await self.toggle('favorite')
+
+    async def scenario_cart(self):
+        await self.toggle('shopping_cart')
+
+    async def scenario_download(self):
+        fmt = self.rng.choice(('txt', 'csv', 'pdf'))
+        await self.call(
+            f'GET /api/recipes/download_shopping_cart/?format={fmt}', 'GET',
+            f'/api/recipes/download_shopping_cart/?format={fmt}',
+            expected=(200, 400))
+
+    async def scenario_follow(self):
+        """Подписка или отписка, затем страница подписок."""
+        author_id = self.rng.choice(self.command.authors)
+        path = f'/api/users/{author_id}/subscribe/'
+        status, _ = await self.call(
+            'POST /api/users/{id}/subscribe/', 'POST', path,
+            expected=(201, 400))
+        if status == 400:
+            await self.call(
+                'DELETE /api/users/{id}/subscribe/', 'DELETE', path,
+                expected=(204, 400))
+        await self.call(
+            'GET /api/users/subscriptions/', 'GET',
+            '/api/users/subscriptions/?recipes_limit=3')
+
+
+class Command(BaseCommand):
+    """Нагрузочный тест API: виртуальные пользователи параллельно
+    выполняют сценарии (лента с тегами, избранное, корзина, скачивание
+    списка покупок, подписки) против запущенного сервера.
+
+    Пользователи и пароль совпадают с созданными generate_dataset.
+    Для каждого эндпоинта выводятся пропускная способность, задержки
+    p50/p95/p99 и доля ошибок."""
+    help = 'Нагрузочный тест API на asyncio.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help='Количество параллельных пользователей.')
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Длительность теста в секундах.')
+        parser.add_argument(
+            '--think-time', type=float, default=0,
+            help='Средняя пауза между сценариями в секундах.')
+        parser.add_argument(
+            '--mix', default=','.join(
+                f'{name}={weight}' for name, weight in DEFAULT_MIX.items()),
+            help='Веса сценариев: browse=60,favorite=15,...')
+        parser.add_argument('--prefix', default='synthetic')
+        parser.add_argument('--password', default='synthetic-password')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--output', type=Path, help='Файл JSON-отчета.')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.prefix = options['prefix']
+        self.password = options['password']
+        self.seed = options['seed']
+        self.think_time = options['think_time']
+        self.mix = self.parse_mix(options['mix'])
+        self.stats = Stats()
+
+        try:
+            duration = asyncio.run(
+                self.run(options['users'], options['duration']))
+        except (OSError, HTTPError) as error:
+            raise CommandError(error)
+
+        report = self.stats.report(duration)
+        self.write_report(report, duration)
+        if options['output']:
+            options['output'].write_text(json.dumps(
+                {'duration': duration, 'users': options['users'],
+                 'endpoints': report}, ensure_ascii=False, indent=2))
+
+    def parse_mix(self, value):
+        mix = {}
+        for item in value.split(','):
+            name, _, weight = item.partition('=')
+            if name not in DEFAULT_MIX:
+                raise CommandError(
+                    f'Неизвестный сценарий {name}, доступны: '
+                    f'{", ".join(DEFAULT_MIX)}.')
+            mix[name] = float(weight or 1)
+        return mix
+
+    async def prepare(self):
+        """Загружает теги, рецепты и авторов, из которых выбирают
+        сценарии."""
+        connection = Connection(self.host, self.port)
+        status, content = await connection.request('GET', '/api/tags/')
+        if status != 200:
+            raise HTTPError(f'/api/tags/: ответ {status}.')
+        self.tags = [tag['slug'] for tag in json.loads(content)]
+        self.recipes, authors = [], set()
+        for page in range(1, 6):
+            status, content = await connection.request(
+                'GET', f'/api/recipes/?page={page}&limit=100')
+            if status != 200:
+                break
+            for recipe in json.loads(content)['results']:
+                self.recipes.append(recipe['id'])
+                authors.add(recipe['author']['id'])
+        await connection.close()
+        if not self.recipes:
+            raise HTTPError(
+                'Нет рецептов, заполните базу командой generate_dataset.')
+        self.authors = sorted(authors)
+
+    async def run(self, users, duration):
+        await self.prepare()
+        virtual_users = [VirtualUser(self, number) for number in range(users)]
+        await asyncio.gather(*(user.login() for user in virtual_users))
+        self.stdout.write(
+            f'Пользователей: {users}, длительность: {duration} с.')
+        started = time.monotonic()
+        await asyncio.gather(*(
+            user.run(started + duration) for user in virtual_users))
+        return time.monotonic() - started
+
+    def write_report(self, report, duration):
+        total = sum(item['requests'] for item in report.values())
+        errors = sum(item['errors'] for item in report.values())
+        self.stdout.write(
+            f'{"Эндпоинт":<58}{"запр.":>7}{"rps":>8}{"p50":>8}'
+            f'{"p95":>8}{"p99":>8}{"ошибки":>9}')
+        for name, item in report.items():
+            self.stdout.write(
+                f'{name:<58}{item["requests"]:>7}{item["rps"]:>8}'
+                f'{item["p50_ms"]:>8}{item["p95_ms"]:>8}'
+                f'{item["p99_ms"]:>8}{item["error_rate"]:>9.2%}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего запросов: {total}, {total / duration:.1f} в секунду, '
+            f'ошибок: {errors}.'))
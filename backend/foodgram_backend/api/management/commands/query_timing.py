@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.middleware import sample_rate
+
+
+class Command(BaseCommand):
+    """Меняет долю запросов, которые замеряет QueryTimingMiddleware.
+    Работающие процессы сервера подхватывают значение в течение
+    секунды, перезапуск не нужен."""
+    help = 'Показывает или задает долю замеряемых запросов (0..1).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('rate', nargs='?', type=float)
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Вернуть значение QUERY_TIMING_SAMPLE_RATE из настроек.',
+        )
+
+    def handle(self, *args, **options):
+        rate = options['rate']
+        if options['reset']:
+            sample_rate.path.unlink(missing_ok=True)
+        elif rate is not None:
+            if not 0 <= rate <= 1:
+                raise CommandError('Доля должна быть от 0 до 1.')
+            sample_rate.set(rate)
+        sample_rate.checked_at = 0
+        self.stdout.write(f'Доля замеряемых запросов: {sample_rate.get()}.')
@@ -0,0 +1,69 @@
+import os
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+REQUESTS = Counter(
+    'foodgram_http_requests_total',
+    'Количество запросов к API.',
+    ['view', 'method', 'status'],
+)
+LATENCY = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Время ответа.',
+    ['view'],
+    buckets=settings.METRICS_LATENCY_BUCKETS,
+)
+QUERIES = Histogram(
+    'foodgram_db_queries_per_request',
+    'Количество SQL-запросов на один запрос к API.',
+    ['view'],
+    buckets=settings.METRICS_QUERY_BUCKETS,
+)
+DB_TIME = Histogram(
+    'foodgram_db_duration_seconds',
+    'Время SQL-запросов за один запрос к API.',
+    ['view'],
+    buckets=settings.METRICS_LATENCY_BUCKETS,
+)
+
+
+def get_view_name(view_func, method):
+    """Метка вида RecipesViewSet.list или RecipesViewSet.favorite."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', 'unknown')
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    return f'{cls.__name__}.{action}'
+
+
+def observe(view, method, status, duration, queries, db_time):
+    REQUESTS.labels(view, method, status).inc()
+    LATENCY.labels(view).observe(duration)
+    QUERIES.labels(view).observe(queries)
+    DB_TIME.labels(view).observe(db_time)
+
+
+def get_registry():
+    """При нескольких процессах gunicorn метрики каждого процесса
+    пишутся в файлы каталога PROMETHEUS_MULTIPROC_DIR и суммируются
+    при чтении."""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics(request):
+    """Метрики в текстовом формате Prometheus. Если задан METRICS_TOKEN,
+    нужен заголовок Authorization: Bearer <токен>."""
+    if settings.METRICS_TOKEN and request.headers.get(
+            'Authorization') != f'Bearer {settings.METRICS_TOKEN}':
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
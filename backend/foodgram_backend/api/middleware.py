@@ -0,0 +1,250 @@
+import logging
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import get_view_name, observe
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+LITERALS = re.compile(r"'[^']*'|\b\d+\b")
+
+
+def get_shape(sql):
+    """Форма запроса: параметры и списки IN заменены на ?."""
+    return LITERALS.sub('?', IN_LIST.sub('IN (?)', sql))
+
+
+class SampleRate:
+    """Доля запросов, которые замеряются. Берется из файла
+    QUERY_TIMING_RATE_FILE (его пишет команда query_timing), а если
+    файла нет - из QUERY_TIMING_SAMPLE_RATE. Файл перечитывается
+    не чаще раза в секунду, поэтому долю можно менять без перезапуска
+    во всех процессах сервера."""
+    check_interval = 1
+
+    def __init__(self):
+        self.path = Path(settings.QUERY_TIMING_RATE_FILE)
+        self.value = settings.QUERY_TIMING_SAMPLE_RATE
+        self.checked_at = 0
+        self.modified_at = None
+
+    def get(self):
+        now = time.monotonic()
+        if now - self.checked_at < self.check_interval:
+            return self.value
+        self.checked_at = now
+        try:
+            modified_at = self.path.stat().st_mtime
+        except OSError:
+            self.modified_at = None
+            self.value = settings.QUERY_TIMING_SAMPLE_RATE
+            return self.value
+        if modified_at != self.modified_at:
+            self.modified_at = modified_at
+            try:
+                self.value = float(self.path.read_text())
+            except (OSError, ValueError):
+                self.value = settings.QUERY_TIMING_SAMPLE_RATE
+        return self.value
+
+    def set(self, value):
+        self.path.write_text(str(value))
+
+
+sample_rate = SampleRate()
+
+query_observers = ContextVar('query_observers', default=())
+
+
+def run_query_observers(execute, sql, params, many, context):
+    """Обертка execute_wrapper, которая ставится на каждое соединение
+    (см. ApiConfig.ready) и передает запрос наблюдателям текущего
+    контекста. Контекст переходит в потоки sync_to_async, поэтому
+    под ASGI учитываются и запросы, выполненные не в потоке
+    middleware."""
+    for observer in reversed(query_observers.get()):
+        execute = partial(observer, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_observers(sender, connection, **kwargs):
+    """Обработчик сигнала connection_created."""
+    if run_query_observers not in connection.execute_wrappers:
+        connection.execute_wrappers.append(run_query_observers)
+
+
+@contextmanager
+def observe_queries(observer):
+    token = query_observers.set((*query_observers.get(), observer))
+    try:
+        yield observer
+    finally:
+        query_observers.reset(token)
+
+
+class QueryCollector:
+    """Обертка execute_wrapper: запоминает каждый запрос и его время."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def duration(self):
+        return sum(duration for _, duration in self.queries)
+
+    def top_shapes(self, limit):
+        """Повторяющиеся формы запросов: количество и суммарное время."""
+        counts = Counter()
+        durations = defaultdict(float)
+        for sql, duration in self.queries:
+            shape = get_shape(sql)
+            counts[shape] += 1
+            durations[shape] += duration
+        return [
+            (count, durations[shape], shape)
+            for shape, count in counts.most_common(limit) if count > 1
+        ]
+
+
+class QueryCounter:
+    """Обертка execute_wrapper: только количество и суммарное время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class HybridMiddleware:
+    """Основа middleware, которое работает и под WSGI, и под ASGI:
+    под ASGI Django не переводит асинхронные вьюхи в синхронный
+    режим из-за него."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """Собирает метрики Prometheus по каждому запросу: количество,
+    время ответа, число SQL-запросов и время базы данных с меткой
+    вьюсета и действия DRF (RecipesViewSet.list)."""
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with observe_queries(QueryCounter()) as counter:
+            response = self.get_response(request)
+        self.observe(request, response, started, counter)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with observe_queries(QueryCounter()) as counter:
+            response = await self.get_response(request)
+        self.observe(request, response, started, counter)
+        return response
+
+    def observe(self, request, response, started, counter):
+        observe(
+            getattr(request, 'metrics_view', 'unresolved'),
+            request.method,
+            response.status_code,
+            time.perf_counter() - started,
+            counter.count,
+            counter.duration,
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = get_view_name(view_func, request.method)
+
+
+class QueryTimingMiddleware(HybridMiddleware):
+    """Считает SQL-запросы и время базы данных для доли запросов
+    (см. SampleRate), добавляет заголовок Server-Timing и пишет
+    в лог медленные запросы с самыми частыми формами SQL.
+
+    Запросы, которые выполняются при чтении потокового ответа
+    (скачивание списка покупок), не учитываются."""
+
+    @staticmethod
+    def sampled():
+        rate = sample_rate.get()
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        started = time.perf_counter()
+        with observe_queries(QueryCollector()) as collector:
+            response = self.get_response(request)
+        return self.add_timing(request, response, started, collector)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        started = time.perf_counter()
+        with observe_queries(QueryCollector()) as collector:
+            response = await self.get_response(request)
+        return self.add_timing(request, response, started, collector)
+
+    def add_timing(self, request, response, started, collector):
+        total = time.perf_counter() - started
+        db_time = collector.duration
+        response['Server-Timing'] = (
+            f'db;dur={db_time * 1000:.1f};'
+            f'desc="{len(collector.queries)} queries", '
+            f'total;dur={total * 1000:.1f}')
+        if total >= settings.SLOW_REQUEST_THRESHOLD:
+            self.log_slow_request(request, response, total, collector)
+        return response
+
+    def log_slow_request(self, request, response, total, collector):
+        match = request.resolver_match
+        shapes = ''.join(
+            f'\n  {count} x {duration * 1000:.1f} ms: {shape}'
+            for count, duration, shape in collector.top_shapes(
+                settings.QUERY_TIMING_TOP_SHAPES))
+        logger.warning(
+            'Медленный запрос %s %s (%s) %s: %.1f ms, '
+            'SQL: %d запр., %.1f ms.%s',
+            request.method,
+            request.get_full_path(),
+            match.view_name if match else '-',
+            response.status_code,
+            total * 1000,
+            len(collector.queries),
+            collector.duration * 1000,
+            shapes,
+        )
@@ -0,0 +1,107 @@
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from rest_framework.response import Response
+
+
+class AsyncReadMixin:
+    """Асинхронное чтение для вьюсета под ASGI (ASYNC_VIEWS = True).
+
+    list и retrieve с ответом в JSON выполняются методами alist
+    и aretrieve через async ORM, поэтому, пока ждут базу, процесс
+    обслуживает другие запросы. Аутентификация и проверка прав
+    (initial), запись и browsable API выполняются синхронными методами
+    DRF в потоке, как их запускает Django для синхронных вьюх.
+    При ASYNC_VIEWS = False вьюсет работает как обычный."""
+    async_actions = ('list', 'retrieve')
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if settings.ASYNC_VIEWS:
+            markcoroutinefunction(view)
+        return view
+
+    def dispatch(self, request, *args, **kwargs):
+        if not settings.ASYNC_VIEWS:
+            return super().dispatch(request, *args, **kwargs)
+        return self.adispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """Асинхронный вариант APIView.dispatch."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = self.get_async_handler(request)
+            if handler is None:
+                handler = sync_to_async(self.get_handler(request))
+            else:
+                await self.aprepare(request)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs)
+        renderer = getattr(self.response, 'accepted_renderer', None)
+        if renderer is not None and renderer.format == 'json':
+            # JSON рендерится без обращений к базе, поток не нужен.
+            self.response.render()
+        return self.response
+
+    def get_handler(self, request):
+        method = request.method.lower()
+        if method in self.http_method_names:
+            return getattr(self, method, self.http_method_not_allowed)
+        return self.http_method_not_allowed
+
+    def get_async_handler(self, request):
+        """alist или aretrieve, если запрос читает данные в JSON."""
+        if (request.method in ('GET', 'HEAD')
+                and self.action in self.async_actions
+                and request.accepted_renderer.format == 'json'):
+            return getattr(self, f'a{self.action}')
+        return None
+
+    async def aprepare(self, request):
+        """Загружает в запрос данные, которые сериализаторы иначе
+        прочитали бы из базы синхронно."""
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError,
+                ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(
+            queryset, self.request, view=self)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(
+            [obj async for obj in queryset], many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
@@ -1,5 +1,24 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from functools import partial
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from rest_framework.pagination import PageNumberPagination
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .utils.counts import get_count
+
+
+def is_keyset_request(request):
+    """Пагинация по ключу включается параметром ?pagination=cursor
+    или переданным курсором."""
+    params = request.query_params
+    return params.get('pagination') == 'cursor' or 'cursor' in params
 
 
 class PageLimitPagination(PageNumberPagination):
@@ -8,6 +27,152 @@ class PageLimitPagination(PageNumberPagination):
     page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
     page_query_param = 'page'
     page_size_query_param = 'limit'
+    max_page_size = settings.MAX_PAGE_SIZE
     page_query_description = 'Номер страницы.'
     page_size_query_description = (
         'Количество объектов на странице (по умолчанию 6).')
+
+
+class CountedPaginator(Paginator):
+    """Paginator с заранее известным количеством объектов."""
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.__dict__['count'] = count
+
+
+class CachedCountPagination(PageLimitPagination):
+    """Пагинация page/limit, которая не считает COUNT(*) на каждый
+    запрос: количество кешируется по фильтрам запроса, а для больших
+    таблиц без фильтров берется оценка планировщика. Поле count_exact
+    в ответе показывает, точное ли количество.
+
+    Модели, изменение которых сбрасывает кеш, перечисляются
+    в атрибуте count_models вьюсета."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        models = {queryset.model, *getattr(view, 'count_models', ())}
+        count, self.count_exact = get_count(queryset, request, models)
+        self.django_paginator_class = partial(CountedPaginator, count=count)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Асинхронный вариант paginate_queryset: количество считается
+        в потоке (кеш, оценка планировщика), страница читается через
+        async ORM."""
+        models = {queryset.model, *getattr(view, 'count_models', ())}
+        count, self.count_exact = await sync_to_async(get_count)(
+            queryset, request, models)
+        paginator = CountedPaginator(
+            queryset, self.get_page_size(request), count=count)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)))
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        self.request = request
+        return self.page.object_list
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_exact'] = self.count_exact
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_exact'] = {'type': 'boolean'}
+        return response_schema
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по ключу (pub_date, id) для ленты рецептов:
+    /?pagination=cursor&limit=<integer>&cursor=<string>
+
+    Следующая страница выбирается условием по последней записи
+    предыдущей, поэтому не нужны COUNT(*) и OFFSET."""
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    page_size_query_param = 'limit'
+    max_page_size = settings.MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def encode_cursor(self, obj):
+        value = f'{obj.pub_date.isoformat()}|{obj.pk}'
+        return urlsafe_b64encode(value.encode()).decode()
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            pub_date, pk = urlsafe_b64decode(
+                cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(pub_date), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_page_queryset(self, queryset, request):
+        """Записи после курсора, на одну больше размера страницы."""
+        self.request = request
+        self.limit = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk))
+        return queryset[:self.limit + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.get_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.get_page([
+            obj async for obj in self.get_page_queryset(queryset, request)])
+
+    def get_page(self, page):
+        self.has_next = len(page) > self.limit
+        page = page[:self.limit]
+        self.next_cursor = (
+            self.encode_cursor(page[-1]) if self.has_next else None)
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.next_cursor)
+
+    def get_first_link(self):
+        url = self.request.build_absolute_uri()
+        return remove_query_param(url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'first': self.get_first_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'first': {'type': 'string'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,82 @@
+import csv
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from fpdf import FPDF
+from rest_framework.renderers import BaseRenderer
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи."""
+    def write(self, value):
+        return value
+
+
+class ShoppingCartRenderer(ABC, BaseRenderer):
+    """Базовый класс выгрузки списка покупок.
+    Формат выбирается параметром ?format=<txt|csv|pdf>
+    или заголовком Accept."""
+    charset = 'utf-8'
+    title = 'Ваш список покупок:'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Используется только для ответов с ошибками."""
+        if not data:
+            return b''
+        if isinstance(data, dict):
+            data = '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return str(data).encode('utf-8')
+
+    @abstractmethod
+    def stream(self, items):
+        """Возвращает генератор частей файла по строкам
+        (название, единица измерения, количество)."""
+
+
+class TextShoppingCartRenderer(ShoppingCartRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, items):
+        yield f'{self.title}\n\n'
+        for name, measurement_unit, amount in items:
+            yield f'{name} ({measurement_unit}): {amount}\n'
+
+
+class CSVShoppingCartRenderer(ShoppingCartRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, items):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('Ингредиент', 'Единица измерения',
+                               'Количество'))
+        for item in items:
+            yield writer.writerow(item)
+
+
+class PDFShoppingCartRenderer(ShoppingCartRenderer):
+    """PDF собирается целиком: формат не допускает потоковой записи,
+    но строки по-прежнему читаются из базы курсором."""
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def stream(self, items):
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.add_font('DejaVu', '', settings.SHOPPING_CART_PDF_FONT, uni=True)
+        pdf.set_font('DejaVu', size=16)
+        pdf.cell(0, 10, txt=self.title, ln=1)
+        pdf.set_font('DejaVu', size=12)
+        for name, measurement_unit, amount in items:
+            pdf.cell(0, 8, txt=f'{name} ({measurement_unit}): {amount}',
+                     ln=1)
+        yield pdf.output(dest='S').encode('latin-1')
+
+
+SHOPPING_CART_RENDERERS = (
+    TextShoppingCartRenderer,
+    CSVShoppingCartRenderer,
+    PDFShoppingCartRenderer,
+)
@@ -1,14 +1,17 @@
 import base64
+import binascii
 
 from django.conf import settings
 from django.core.files.base import ContentFile
-from django.db.models import F
-from django.shortcuts import get_object_or_404
+from django.db import transaction
 from rest_framework import exceptions, serializers
 from rest_framework.fields import SerializerMethodField
 
+from recipes.images import schedule_renditions
 from recipes.models import (Favorites, Ingredients, Recipes,
-                            RecipesIngredients, ShoppingList, Tags)
+                            RecipesIngredients, ShoppingList,
+                            ShoppingListIngredients, Tags)
+from recipes.signals import apply_shopping_lists_manually
 from users.serializers import CustomUserSerializer
 
 
@@ -30,18 +33,53 @@ class RecipesIngredientsSerializer(serializers.Serializer):
 
 
 class CustomImageField(serializers.ImageField):
-    """Декодирует строку base64 в картинку и сохраняет ее как файл."""
+    """Декодирует строку base64 в картинку и сохраняет ее как файл.
+    Формат и размер проверяются до декодирования строки."""
     def to_internal_value(self, data):
         if 'data' in data and ';base64' in data:
             format, imagestr = data.split(';base64,')
-            extension = format.split('/')[-1]
-            data = ContentFile(
-                base64.b64decode(imagestr),
-                name='temp.' + extension
-            )
+            extension = format.split('/')[-1].lower()
+            if extension not in settings.RECIPE_IMAGE_FORMATS:
+                raise exceptions.ValidationError(
+                    'Неподдерживаемый формат изображения.')
+            if len(imagestr) * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE:
+                raise exceptions.ValidationError(
+                    'Размер изображения не может превышать '
+                    f'{settings.RECIPE_IMAGE_MAX_SIZE // 1024 // 1024} Мб.')
+            try:
+                decoded = base64.b64decode(imagestr, validate=True)
+            except binascii.Error:
+                raise exceptions.ValidationError(
+                    'Некорректная строка base64.')
+            data = ContentFile(decoded, name='temp.' + extension)
             return super().to_internal_value(data)
 
 
+class ImageRenditionsField(serializers.Field):
+    """Ссылки на уменьшенные копии фото рецепта. Пока копии
+    не готовы, возвращается ссылка на исходное фото."""
+    renditions = (
+        ('card', 'image_card'),
+        ('detail', 'image_detail'),
+        ('webp', 'image_webp'),
+    )
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        request = self.context.get('request')
+        result = {}
+        for name, field in self.renditions:
+            url = (getattr(recipe, field) or recipe.image).url
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            result[name] = url
+        return result
+
+
 class TagsSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -52,29 +90,27 @@ class TagsSerializer(serializers.ModelSerializer):
 class RecipesReadSerializer(serializers.ModelSerializer):
     """Сериализатор для просмотра рецептов."""
     tags = TagsSerializer(many=True)
-    # author = CustomUserSerializer()
-    author = SerializerMethodField(method_name='get_author')
+    author = CustomUserSerializer(read_only=True)
     is_favorited = SerializerMethodField(method_name='get_favorited')
     ingredients = SerializerMethodField(method_name='get_ingredients')
     is_in_shopping_cart = SerializerMethodField(
         method_name='get_shopping_cart')
     image = CustomImageField()
+    images = ImageRenditionsField()
 
     class Meta:
         model = Recipes
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
+                  'is_in_shopping_cart', 'name', 'image', 'images', 'text',
                   'cooking_time')
         read_only_fields = ('__all__',)
 
-    def get_author(self, obj):
-        request = self.context['request']
-        return CustomUserSerializer(
-            obj.author, context={'request': request}).data
-
     def get_favorited(self, obj):
         """Возвращает True/False об Избранном для пользователя,
-        отправляющего запрос."""
+        отправляющего запрос. Использует аннотацию из queryset,
+        если она есть."""
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if not user.is_authenticated:
             return False
@@ -83,16 +119,24 @@ class RecipesReadSerializer(serializers.ModelSerializer):
 
     def get_ingredients(self, obj):
         """Получает значения полей из модели Ингредиентов
-        и значение amount из общей таблицы RecipesIngredients."""
-        ingredients = obj.ingredients.values(
-            'id', 'name', 'measurement_unit',
-            amount=F('recipesingredients__amount')
-        )
-        return ingredients
+        и значение amount из общей таблицы RecipesIngredients.
+        Строки берутся из prefetch, собранного в queryset."""
+        return [
+            {
+                'id': item.ingredient_id.id,
+                'name': item.ingredient_id.name,
+                'measurement_unit': item.ingredient_id.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in obj.recipesingredients_set.all()
+        ]
 
     def get_shopping_cart(self, obj):
         """Возвращает True/False о добавлении в состав корзины для
-        пользователя, отправляющего запрос."""
+        пользователя, отправляющего запрос. Использует аннотацию
+        из queryset, если она есть."""
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if not user.is_authenticated:
             return False
@@ -129,6 +173,13 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     'Количество ингредиента не может быть менее '
                     f'{settings.MIN_AMOUNT}.')
+
+        unknown = ingredients - Ingredients.objects.in_bulk(
+            ingredients).keys()
+        if unknown:
+            raise exceptions.ValidationError(
+                'Ингредиенты не найдены: '
+                f'{", ".join(map(str, sorted(unknown)))}.')
         return value
 
     def validate_tags(self, value):
@@ -150,6 +201,7 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
                 f'{settings.MIN_COOK_TIME} (мин).')
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         """Создает рецепт и добавляет в связанные модели рецептов
         и ингредиентов, рецептов и тегов новые поля."""
@@ -159,49 +211,91 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
         recipe.tags.set(tags)
 
         RecipesIngredients.objects.bulk_create([RecipesIngredients(
-            ingredient_id=get_object_or_404(Ingredients, pk=ingredient['id']),
+            ingredient_id_id=ingredient['id'],
             amount=ingredient['amount'],
             recipe_id=recipe,
         ) for ingredient in ingredients])
+        schedule_renditions(recipe)
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Проверяет, есть ли в модели объект ингредиентов и тегов
-        и заменяет их, если запрос от автора рецепта."""
+        """Заменяет теги и ингредиенты рецепта, если запрос от автора.
+        Ингредиенты синхронизируются по разнице с текущими строками
+        RecipesIngredients: удаление, изменение количества и добавление
+        выполняются пакетно, а вся разница переносится в списки
+        покупок одним вызовом apply без построчных сигналов."""
         tags = validated_data.pop('tags', None)
         if tags is not None:
             instance.tags.set(tags)
 
         ingredients = validated_data.pop('ingredients', None)
         if ingredients is not None:
-            instance.ingredients.clear()
-
-            for ingredient in ingredients:
-                amount = ingredient['amount']
-                ingredient = get_object_or_404(
-                    Ingredients, pk=ingredient['id'])
-
-                RecipesIngredients.objects.update_or_create(
+            existing = {
+                item.ingredient_id_id: item
+                for item in RecipesIngredients.objects.filter(
+                    recipe_id=instance)
+            }
+            new_amounts = {
+                ingredient['id']: ingredient['amount']
+                for ingredient in ingredients
+            }
+            to_update, changes = [], {}
+            for ingredient_id, amount in new_amounts.items():
+                item = existing.get(ingredient_id)
+                if item is None:
+                    changes[ingredient_id] = amount
+                elif item.amount != amount:
+                    changes[ingredient_id] = amount - item.amount
+                    item.amount = amount
+                    to_update.append(item)
+            removed = existing.keys() - new_amounts.keys()
+            for ingredient_id in removed:
+                changes[ingredient_id] = -existing[ingredient_id].amount
+            with apply_shopping_lists_manually():
+                RecipesIngredients.objects.filter(
+                    recipe_id=instance, ingredient_id__in=removed,
+                ).delete()
+            RecipesIngredients.objects.bulk_update(to_update, ['amount'])
+            RecipesIngredients.objects.bulk_create([
+                RecipesIngredients(
                     recipe_id=instance,
-                    ingredient_id=ingredient,
-                    defaults={'amount': amount}
+                    ingredient_id_id=ingredient_id,
+                    amount=amount,
                 )
-        return super().update(instance, validated_data)
+                for ingredient_id, amount in new_amounts.items()
+                if ingredient_id not in existing
+            ])
+
+            ShoppingListIngredients.objects.apply(
+                instance.in_shopping_cart.values_list('user_id', flat=True),
+                changes,
+            )
+        image_changed = validated_data.get('image') is not None
+        instance = super().update(instance, validated_data)
+        if image_changed:
+            schedule_renditions(instance)
+        return instance
 
     def to_representation(self, instance):
         """Преобразует объект модели в словарь. Создает экземпляр
-        RecipesReadSerializer и возвращает данные сериализатора."""
+        RecipesReadSerializer и возвращает данные сериализатора.
+        Рецепт перечитывается, чтобы prefetch отражал новые теги
+        и ингредиенты."""
         request = self.context.get('request')
         context = {'request': request}
+        instance = Recipes.objects.with_related().with_user_flags(
+            request.user).get(pk=instance.pk)
         return RecipesReadSerializer(instance, context=context).data
 
 
 class RecipesMajorSerializer(serializers.ModelSerializer):
     """Поля для favorite & shopping_cart."""
     image = CustomImageField()
+    images = ImageRenditionsField()
 
     class Meta:
         model = Recipes
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
         read_only_fields = ('author',)
@@ -1,6 +1,7 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
+from .metrics import metrics
 from .views import (IngredientsViewSet, RecipesInCartViewSet, RecipesViewSet,
                     TagsViewSet)
 
@@ -17,6 +18,7 @@ router.register(
 router.register(r'ingredients', IngredientsViewSet, basename='ingredients')
 
 urlpatterns = [
+    re_path(r'^metrics/?$', metrics, name='metrics'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
 ]
@@ -0,0 +1,64 @@
+from calendar import timegm
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from recipes.models import TableVersion
+
+
+def get_validators(table_version, format):
+    """ETag и Last-Modified ответа по версии таблицы."""
+    etag = quote_etag(
+        f'{table_version.table}-{table_version.version}-{format}')
+    return etag, timegm(table_version.updated_at.utctimetuple())
+
+
+def add_validators(response, etag, last_modified):
+    if 200 <= response.status_code < 300 or response.status_code == 304:
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.REFERENCE_DATA_MAX_AGE,
+        )
+    return response
+
+
+def reference_data_condition(view_method):
+    """Условный GET для справочных данных (теги, ингредиенты).
+
+    ETag и Last-Modified берутся из версии таблицы модели вьюсета,
+    которая увеличивается при каждом изменении данных. Если клиент
+    прислал актуальные If-None-Match/If-Modified-Since, возвращается
+    304 без обращения к таблице и сериализации."""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        table_version = TableVersion.objects.get_for(
+            self.get_queryset().model)
+        etag, last_modified = get_validators(
+            table_version, request.accepted_renderer.format)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view_method(self, request, *args, **kwargs)
+        return add_validators(response, etag, last_modified)
+    return wrapper
+
+
+def async_reference_data_condition(view_method):
+    """То же для асинхронных методов вьюсета (alist, aretrieve)."""
+    @wraps(view_method)
+    async def wrapper(self, request, *args, **kwargs):
+        table_version = await TableVersion.objects.aget_for(
+            self.get_queryset().model)
+        etag, last_modified = get_validators(
+            table_version, request.accepted_renderer.format)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await view_method(self, request, *args, **kwargs)
+        return add_validators(response, etag, last_modified)
+    return wrapper
@@ -0,0 +1,71 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+VERSION_KEY = 'count-version:{}'
+
+
+def bump_count_version(sender, **kwargs):
+    """Сбрасывает закешированные количества для модели.
+    Подключается к сигналам изменения данных."""
+    key = VERSION_KEY.format(sender._meta.label_lower)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_count_key(request, models):
+    """Ключ кеша количества: фильтры запроса без параметров
+    страницы, пользователь и версии моделей, от которых зависит
+    результат."""
+    labels = sorted(model._meta.label_lower for model in models)
+    versions = cache.get_many([VERSION_KEY.format(label) for label in labels])
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        if key not in settings.COUNT_IGNORED_PARAMS
+        for value in values
+    )
+    raw = repr((
+        request.path,
+        request.user.pk,
+        params,
+        [versions.get(VERSION_KEY.format(label), 0) for label in labels],
+    ))
+    return 'count:' + md5(raw.encode()).hexdigest()
+
+
+def get_estimated_count(model):
+    """Оценка числа строк таблицы по статистике планировщика."""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def get_count(queryset, request, models):
+    """Возвращает (количество, точное ли оно).
+
+    Для запросов без условий по большим таблицам используется оценка
+    планировщика, остальные количества кешируются на COUNT_CACHE_TTL
+    секунд и сбрасываются при изменении связанных моделей."""
+    if not queryset.query.where:
+        estimate = get_estimated_count(queryset.model)
+        if estimate is not None and (
+                estimate >= settings.APPROXIMATE_COUNT_THRESHOLD):
+            return estimate, False
+
+    key = get_count_key(request, models)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.COUNT_CACHE_TTL)
+    return count, True
@@ -0,0 +1,103 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+
+from recipes.models import Ingredients
+
+
+def normalize(value):
+    """Приводит название к виду для поиска: нижний регистр, ё -> е."""
+    return ' '.join(value.lower().replace('ё', 'е').split())
+
+
+def trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class IngredientsIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Названия хранятся отсортированными, поэтому совпадения по началу
+    строки находятся бинарным поиском, а совпадения по подстроке -
+    по пересечению множеств триграмм. Индекс строится при первом
+    обращении и перестраивается после изменения ингредиентов или
+    по истечении INGREDIENTS_INDEX_TTL секунд (изменения, сделанные
+    в других процессах)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._built_at = 0
+
+    def invalidate(self, *args, **kwargs):
+        """Помечает индекс устаревшим. Подходит как обработчик сигнала."""
+        self._data = None
+
+    def build(self):
+        rows = sorted((
+            (normalize(name), {
+                'id': pk,
+                'name': name,
+                'measurement_unit': measurement_unit,
+            })
+            for pk, name, measurement_unit in
+            Ingredients.objects.values_list(
+                'id', 'name', 'measurement_unit').order_by()
+        ), key=lambda row: row[0])
+        keys = [key for key, _ in rows]
+        items = [item for _, item in rows]
+        grams = defaultdict(set)
+        for position, key in enumerate(keys):
+            for gram in trigrams(key):
+                grams[gram].add(position)
+        return keys, items, dict(grams)
+
+    def get_data(self):
+        data = self._data
+        if (data is None
+                or time.monotonic() - self._built_at
+                > settings.INGREDIENTS_INDEX_TTL):
+            with self._lock:
+                if self._data is data:
+                    self._data = self.build()
+                    self._built_at = time.monotonic()
+                data = self._data
+        return data
+
+    def search(self, query, limit=None):
+        """Возвращает ингредиенты, название которых начинается с query,
+        а затем те, в названии которых query встречается в середине."""
+        limit = limit or settings.INGREDIENTS_AUTOCOMPLETE_LIMIT
+        keys, items, grams = self.get_data()
+        query = normalize(query)
+        if not query:
+            return items[:limit]
+
+        result = []
+        position = bisect_left(keys, query)
+        while (position < len(keys) and len(result) < limit
+               and keys[position].startswith(query)):
+            result.append(items[position])
+            position += 1
+        if len(result) == limit:
+            return result
+
+        query_grams = trigrams(query)
+        if query_grams:
+            candidates = set.intersection(
+                *(grams.get(gram, set()) for gram in query_grams))
+        else:
+            candidates = range(len(keys))
+        for position in sorted(candidates):
+            key = keys[position]
+            if query in key and not key.startswith(query):
+                result.append(items[position])
+                if len(result) == limit:
+                    break
+        return result
+
+
+ingredients_index = IngredientsIndex()
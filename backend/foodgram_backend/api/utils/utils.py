@@ -1,33 +1,55 @@
-from django.http import HttpResponse
-from django.db.models import Sum
-
-from recipes.models import ShoppingList, RecipesIngredients
-
-
-def create_shopping_cart_file(user):
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from recipes.models import ShoppingListIngredients
+
+
+def get_shopping_cart_items(user):
+    """Возвращает итератор по суммированному перечню ингредиентов
+    (название, единица измерения, количество). Суммы поддерживаются
+    в ShoppingListIngredients, строки читаются серверным курсором
+    порциями, а не загружаются целиком."""
+    return ShoppingListIngredients.objects.filter(
+        user=user
+    ).values_list(
+        'ingredient_id__name',
+        'ingredient_id__measurement_unit',
+        'amount',
+    ).order_by(
+        'ingredient_id__name'
+    ).iterator(chunk_size=settings.SHOPPING_CART_CHUNK_SIZE)
+
+
+async def aiterate(iterator, size):
+    """Асинхронный итератор поверх синхронного. Части читаются
+    в потоке пачками по size, а не по одной: переход в поток дороже
+    строки файла."""
+    iterator = iter(iterator)
+    read = sync_to_async(lambda: list(islice(iterator, size)))
+    while parts := await read():
+        for part in parts:
+            yield part
+
+
+def create_shopping_cart_file(user, renderer):
     """Создает файл с суммированным перечнем и количеством
-    необходимых ингредиентов."""
+    необходимых ингредиентов в формате переданного рендерера.
+    Под ASGI (ASYNC_VIEWS = True) файл отдается асинхронным
+    итератором: синхронный Django собрал бы в память целиком."""
     if not user.shopping_cart.exists():
         return None
 
-    recipes_list = ShoppingList.objects.filter(
-        user=user).values_list('recipe_id', flat=True)
-
-    shopping_list = RecipesIngredients.objects.filter(
-        recipe_id__in=recipes_list
-    ).values('ingredient_id__name',
-             'ingredient_id__measurement_unit'
-             ).annotate(total_amount=Sum('amount'))
-
-    content = 'Ваш список покупок:\n\n'
-    for item in shopping_list:
-        name = item['ingredient_id__name']
-        amount = item['total_amount']
-        content += f'{name}: {amount}\n'
-
-    response = HttpResponse(content_type='text/plain')
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type += f'; charset={renderer.charset}'
+    content = renderer.stream(get_shopping_cart_items(user))
+    if settings.ASYNC_VIEWS:
+        content = aiterate(content, settings.SHOPPING_CART_CHUNK_SIZE)
+    response = StreamingHttpResponse(content, content_type=content_type)
     response['Content-Disposition'] = (
-        'attachment; filename="shopping_cart.txt"')
-    response.write(content)
+        f'attachment; filename="shopping_cart.{renderer.format}"')
 
     return response
@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import exceptions, status, viewsets
@@ -6,28 +7,55 @@ from rest_framework.filters import SearchFilter
 from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from .utils.caching import (async_reference_data_condition,
+                            reference_data_condition)
+from .utils.ingredients_index import ingredients_index
 from .utils.utils import create_shopping_cart_file
-from recipes.models import (Favorites, Ingredients, Recipes,
+from recipes.models import (Favorites, Ingredients, Recipes, RecipesTags,
                             ShoppingList, Tags)
 from .filters import IngredientsFilter, RecipesFilter
-from .pagination import PageLimitPagination
+from .mixins import AsyncReadMixin
+from .pagination import (CachedCountPagination, KeysetPagination,
+                         is_keyset_request)
+from .renderers import SHOPPING_CART_RENDERERS
 from .permissions import IsAuthorOrAdminOrReadOnly
+from users.utils import aget_subscriptions
 from .serializers import (IngredientsSerializer, RecipesMajorSerializer,
                           RecipesReadSerializer, RecipesWriteSerializer,
                           TagsSerializer)
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(AsyncReadMixin, viewsets.ModelViewSet):
     """Список рецептов."""
     queryset = Recipes.objects.all()
-    pagination_class = PageLimitPagination
+    pagination_class = CachedCountPagination
+    count_models = (RecipesTags, Favorites, ShoppingList)
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipesFilter
 
+    @property
+    def paginator(self):
+        """Пагинация по ключу включается параметром ?pagination=cursor,
+        по умолчанию остается постраничная (page/limit)."""
+        if not hasattr(self, '_paginator') and is_keyset_request(
+                self.request):
+            self._paginator = KeysetPagination()
+        return super().paginator
+
+    async def aprepare(self, request):
+        """Подписки на авторов для поля is_subscribed."""
+        await aget_subscriptions(request)
+
+    def get_queryset(self):
+        """Рецепты с признаками избранного и списка покупок
+        для пользователя, отправляющего запрос."""
+        return Recipes.objects.with_related().with_user_flags(
+            self.request.user)
+
     def get_serializer_class(self):
         """Выбор сериализатора для рецептов в зависимости от метода."""
-        if self.action in SAFE_METHODS:
+        if self.request.method in SAFE_METHODS:
             return RecipesReadSerializer
         return RecipesWriteSerializer
 
@@ -116,11 +144,12 @@ class RecipesViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get', ],
             permission_classes=(IsAuthenticated,),
+            renderer_classes=SHOPPING_CART_RENDERERS,
             url_path='download_shopping_cart')
     def download_shopping_cart(self, request):
-        """Создание списка покупок."""
+        """Создание списка покупок в формате ?format=<txt|csv|pdf>."""
         user = request.user
-        response = create_shopping_cart_file(user)
+        response = create_shopping_cart_file(user, request.accepted_renderer)
 
         if response is None:
             return Response(status=status.HTTP_400_BAD_REQUEST)
@@ -128,7 +157,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
         return response
 
 
-class IngredientsViewSet(viewsets.ModelViewSet):
+class IngredientsViewSet(AsyncReadMixin, viewsets.ModelViewSet):
     """Список ингредиентов."""
     queryset = Ingredients.objects.all()
     serializer_class = IngredientsSerializer
@@ -138,14 +167,54 @@ class IngredientsViewSet(viewsets.ModelViewSet):
     filterset_class = IngredientsFilter
     search_fields = ('name',)
 
+    @reference_data_condition
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @reference_data_condition
+    def list(self, request, *args, **kwargs):
+        """Автодополнение по ?name= обслуживается индексом в памяти:
+        сначала совпадения по началу названия, затем по подстроке."""
+        name = request.query_params.get('name')
+        if name is None:
+            return super().list(request, *args, **kwargs)
+        return Response(ingredients_index.search(name))
+
+    @async_reference_data_condition
+    async def aretrieve(self, request, *args, **kwargs):
+        return await super().aretrieve(request, *args, **kwargs)
+
+    @async_reference_data_condition
+    async def alist(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name is None:
+            return await super().alist(request, *args, **kwargs)
+        return Response(await sync_to_async(ingredients_index.search)(name))
+
 
-class TagsViewSet(viewsets.ModelViewSet):
+class TagsViewSet(AsyncReadMixin, viewsets.ModelViewSet):
     """Список тегов длфя рецептов."""
     queryset = Tags.objects.all()
     serializer_class = TagsSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
 
+    @reference_data_condition
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @reference_data_condition
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @async_reference_data_condition
+    async def aretrieve(self, request, *args, **kwargs):
+        return await super().aretrieve(request, *args, **kwargs)
+
+    @async_reference_data_condition
+    async def alist(self, request, *args, **kwargs):
+        return await super().alist(request, *args, **kwargs)
+
 
 class RecipesInCartViewSet(viewsets.ModelViewSet):
     queryset = Recipes.objects.all()
@@ -0,0 +1,80 @@
+import json
+from collections import defaultdict
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Recipes
+from users.models import User
+
+# Небольшой набор данных generate_dataset для тестов.
+SMALL_DATASET = {
+    'users': 20, 'recipes': 40, 'ingredients': (2, 5),
+    'follows': 5, 'favorites': 8, 'carts': 4,
+}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--query-budget-report', metavar='PATH',
+        help='Файл JSON-отчета: количество SQL-запросов и время ответа '
+             'эндпоинтов из tests/test_query_budget.py.')
+
+
+@pytest.fixture(scope='session', autouse=True)
+def media_root(tmp_path_factory):
+    """Файлы тестов (картинки рецептов) сохраняются во временный
+    каталог, а не в media проекта."""
+    with override_settings(MEDIA_ROOT=tmp_path_factory.mktemp('media')):
+        yield
+
+
+@pytest.fixture(scope='session')
+def seed():
+    """Создает данные командой generate_dataset. Возвращает
+    пользователя с наибольшим числом подписок и рецептов в корзине
+    и рецепт, который чаще всего добавляли в избранное."""
+    def seed(prefix, **params):
+        call_command(
+            'generate_dataset', prefix=prefix, seed=42, stdout=StringIO(),
+            **params)
+        user = User.objects.filter(
+            username__startswith=f'{prefix}_'
+        ).annotate(
+            related=Count('follower', distinct=True)
+            + Count('shopping_cart', distinct=True)
+        ).order_by('-related', 'id').first()
+        recipe = Recipes.objects.filter(
+            name__startswith=prefix).order_by('-favorites_count').first()
+        return SimpleNamespace(user=user, recipe=recipe)
+    return seed
+
+
+@pytest.fixture
+def dataset(db, seed):
+    return seed('test', **SMALL_DATASET)
+
+
+@pytest.fixture
+def user_client(dataset):
+    client = APIClient()
+    client.force_authenticate(dataset.user)
+    return client
+
+
+@pytest.fixture(scope='session')
+def query_budget_report(request):
+    """Замеры эндпоинтов: имя -> набор данных и страница -> замер.
+    В конце сессии пишутся в файл --query-budget-report."""
+    report = defaultdict(dict)
+    yield report
+    path = request.config.getoption('query_budget_report')
+    if path:
+        Path(path).write_text(json.dumps(
+            report, ensure_ascii=False, indent=2, sort_keys=True))
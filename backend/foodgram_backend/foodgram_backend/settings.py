@@ -12,6 +12,10 @@ SECRET_KEY = os.getenv('SECRET_KEY')
 
 DEBUG = os.getenv('DEBUG') == 'True'
 
+# Асинхронное чтение рецептов, тегов и ингредиентов (api.mixins).
+# Включается при запуске под ASGI (gunicorn с UvicornWorker).
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS') == 'True'
+
 ALLOWED_HOSTS = ['*']
 # CSRF_TRUSTED_ORIGINS = ['http://localhost']
 CSRF_TRUSTED_ORIGINS = ['https://nrthbnd.serveminecraft.net']
@@ -28,6 +32,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
@@ -40,9 +45,12 @@ INSTALLED_APPS = [
     'django_filters',
 
     'import_export',
+    'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.QueryTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,6 +95,17 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'tokens': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tokens',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -143,12 +162,21 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
 }
+MAX_PAGE_SIZE = 100
+TOKEN_CACHE_ALIAS = 'tokens'
+TOKEN_CACHE_TTL = 60
+COUNT_CACHE_TTL = 30
+# Версии справочных таблиц для ETag: кеш каждого процесса сбрасывается
+# при изменении, в других процессах устаревает не дольше этого срока.
+TABLE_VERSION_CACHE_TTL = 10
+COUNT_IGNORED_PARAMS = ('page', 'limit', 'cursor', 'recipes_limit')
+APPROXIMATE_COUNT_THRESHOLD = 100_000
 
 DJOSER = {
     'LOGIN_FIELD': 'email',
@@ -169,6 +197,37 @@ MIN_AMOUNT = 1
 MIN_COOK_TIME = 1
 EMPTY_VALUE = '-пусто-'
 
+RECIPES_SEARCH_CONFIG = 'russian'
+
+RECIPE_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+RECIPE_IMAGE_FORMATS = ('png', 'jpeg', 'jpg', 'gif', 'webp')
+RECIPE_IMAGE_WORKERS = 2
+
+REFERENCE_DATA_MAX_AGE = 60 * 60
+
+INGREDIENTS_AUTOCOMPLETE_LIMIT = 20
+INGREDIENTS_INDEX_TTL = 300
+INGREDIENTS_DATA_DIR = Path(os.getenv(
+    'INGREDIENTS_DATA_DIR', BASE_DIR.parent.parent / 'data'))
+INGREDIENTS_LOAD_CHUNK_SIZE = 1000
+
+SHOPPING_CART_CHUNK_SIZE = 2000
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+)
+
+QUERY_TIMING_SAMPLE_RATE = float(os.getenv('QUERY_TIMING_SAMPLE_RATE', 0))
+QUERY_TIMING_RATE_FILE = os.getenv(
+    'QUERY_TIMING_RATE_FILE', BASE_DIR / 'query_timing_rate')
+QUERY_TIMING_TOP_SHAPES = 5
+SLOW_REQUEST_THRESHOLD = float(os.getenv('SLOW_REQUEST_THRESHOLD', 0.5))
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS_QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": True,
@@ -192,6 +251,11 @@ LOGGING = {
             "propagate": False,
             "level": "INFO",
         },
+        "api.middleware": {
+            "handlers": ["console"],
+            "propagate": False,
+            "level": "INFO",
+        },
         "django.security.DisallowedHost": {
             "level": "ERROR",
             "handlers": ["console"],
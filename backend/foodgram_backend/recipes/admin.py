@@ -4,16 +4,29 @@ from django.contrib.admin import display
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
 
+from .images import schedule_renditions
 from .models import (Ingredients, Recipes, RecipesIngredients,
                      RecipesTags, ShoppingList, Tags)
 
 
 class RecipesIngredientsInline(admin.TabularInline):
     model = RecipesIngredients
+    autocomplete_fields = ('ingredient_id',)
+    extra = 1
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe_id', 'ingredient_id')
 
 
 class RecipesTagsInline(admin.TabularInline):
     model = RecipesTags
+    autocomplete_fields = ('tag_id',)
+    extra = 1
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe_id', 'tag_id')
 
 
 class IngredientResource(resources.ModelResource):
@@ -30,7 +43,8 @@ class IngredientsAdmin(ImportExportModelAdmin):
         'measurement_unit',
     )
     search_fields = ('name',)
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
+    show_full_result_count = False
     empty_value_display = settings.EMPTY_VALUE
 
 
@@ -57,21 +71,28 @@ class RecipesAdmin(admin.ModelAdmin):
         'name',
         'author',
         'in_favorites',
+        'in_carts_count',
     )
-    list_filter = (
-        'name',
-        'author',
-        'tags',
-    )
+    list_filter = ('tags',)
+    list_select_related = ('author',)
+    search_fields = ('name', '=author__username')
+    autocomplete_fields = ('author',)
+    show_full_result_count = False
     readonly_fields = (
         'in_favorites',
+        'in_carts_count',
     )
     inlines = (RecipesIngredientsInline, RecipesTagsInline,)
     empty_value_display = settings.EMPTY_VALUE
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if 'image' in form.changed_data:
+            schedule_renditions(obj)
+
     @display(description='Сколько в избранных')
     def in_favorites(self, obj):
-        return obj.in_favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(RecipesIngredients)
@@ -82,6 +103,9 @@ class RecipesIngredientsAdmin(admin.ModelAdmin):
         'ingredient_id',
         'amount',
     )
+    list_select_related = ('recipe_id', 'ingredient_id')
+    autocomplete_fields = ('recipe_id', 'ingredient_id')
+    show_full_result_count = False
     empty_value_display = settings.EMPTY_VALUE
 
 
@@ -92,4 +116,7 @@ class ShoppingListsAdmin(admin.ModelAdmin):
         'user',
         'recipe_id',
     )
+    list_select_related = ('user', 'recipe_id')
+    autocomplete_fields = ('user', 'recipe_id')
+    show_full_result_count = False
     empty_value_display = settings.EMPTY_VALUE
@@ -0,0 +1,55 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Follow, User
+from .models import Favorites, Recipes, ShoppingList
+
+# Модель со счетчиком, поле счетчика, модель связи, поле связи.
+COUNTERS = (
+    (Recipes, 'favorites_count', Favorites, 'recipe_id'),
+    (Recipes, 'in_carts_count', ShoppingList, 'recipe_id'),
+    (User, 'recipes_count', Recipes, 'author'),
+    (User, 'followers_count', Follow, 'author'),
+)
+
+
+def change_counters(instance, delta):
+    """Изменяет счетчики, которые зависят от строки instance,
+    одним UPDATE с F() на каждый счетчик. Счетчик не опускается
+    ниже нуля, расхождения исправляет reconcile_counters."""
+    for model, field, related_model, related_field in COUNTERS:
+        if not isinstance(instance, related_model):
+            continue
+        pk = getattr(
+            instance, related_model._meta.get_field(related_field).attname)
+        queryset = model.objects.filter(pk=pk)
+        if delta < 0:
+            queryset = queryset.filter(**{f'{field}__gte': -delta})
+        queryset.update(**{field: F(field) + delta})
+
+
+def actual_count(related_model, related_field):
+    """Подзапрос с фактическим количеством связанных строк."""
+    return Coalesce(Subquery(
+        related_model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
+
+
+def reconcile_counters(dry_run=False):
+    """Сверяет счетчики с фактическими количествами и исправляет
+    расхождения. Возвращает {счетчик: количество неверных строк}."""
+    result = {}
+    for model, field, related_model, related_field in COUNTERS:
+        actual = actual_count(related_model, related_field)
+        queryset = model.objects.annotate(
+            actual=actual).exclude(**{field: F('actual')})
+        name = f'{model._meta.label}.{field}'
+        if dry_run:
+            result[name] = queryset.count()
+        else:
+            result[name] = queryset.update(**{field: actual})
+    return result
@@ -0,0 +1,70 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import get_thumbnail
+
+from .models import Recipes
+
+logger = logging.getLogger(__name__)
+
+# Поле модели -> (геометрия, параметры sorl-thumbnail).
+RENDITIONS = {
+    'image_card': ('480x320', {'crop': 'center', 'quality': 85}),
+    'image_detail': ('1200', {'upscale': False, 'quality': 85}),
+    'image_webp': ('480x320', {'crop': 'center', 'format': 'WEBP',
+                               'quality': 80}),
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS,
+    thread_name_prefix='recipe-images',
+)
+
+
+def make_renditions(recipe_id):
+    """Создает уменьшенные копии фото рецепта и сохраняет их имена.
+    При THUMBNAIL_DEBUG = False sorl-thumbnail не выбрасывает ошибку,
+    а возвращает имя несозданного файла, поэтому каждая копия
+    проверяется в хранилище; если какой-то нет, поля остаются пустыми
+    и отдается исходное фото. Если за время обработки фото заменили,
+    результат отбрасывается."""
+    close_old_connections()
+    try:
+        recipe = Recipes.objects.only('image').get(pk=recipe_id)
+        thumbnails = {
+            field: get_thumbnail(recipe.image, geometry, **options)
+            for field, (geometry, options) in RENDITIONS.items()
+        }
+        missing = [
+            field for field, thumbnail in thumbnails.items()
+            if not thumbnail.exists()
+        ]
+        if missing:
+            logger.warning(
+                'Фото рецепта %s не обработано, нет копий: %s.',
+                recipe_id, ', '.join(missing))
+        renditions = {
+            field: '' if missing else thumbnail.name
+            for field, thumbnail in thumbnails.items()
+        }
+        Recipes.objects.filter(
+            pk=recipe_id, image=recipe.image.name
+        ).update(**renditions)
+    except Recipes.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception(
+            'Не удалось обработать фото рецепта %s.', recipe_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(recipe):
+    """Ставит обработку фото в фоновую очередь после фиксации
+    транзакции, в которой рецепт был сохранен."""
+    Recipes.objects.filter(pk=recipe.pk).update(
+        **{field: '' for field in RENDITIONS})
+    transaction.on_commit(
+        lambda: executor.submit(make_renditions, recipe.pk))
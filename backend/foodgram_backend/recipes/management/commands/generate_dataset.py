@@ -0,0 +1,237 @@
+import random
+import time
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from recipes.models import (Favorites, Ingredients, Recipes,
+                            RecipesIngredients, RecipesTags, ShoppingList,
+                            Tags)
+from users.models import Follow, User
+
+DEFAULT_TAGS = (
+    ('Завтрак', 'breakfast', '#E26C2D'),
+    ('Обед', 'lunch', '#49B64E'),
+    ('Ужин', 'dinner', '#8775D2'),
+)
+IMAGE_NAME = 'recipes/images/synthetic.png'
+
+
+def zipf_weights(size, skew):
+    """Накопленные веса распределения Ципфа: элемент с рангом r
+    выбирается с вероятностью, пропорциональной 1 / r ** skew."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, size + 1)))
+
+
+class Command(BaseCommand):
+    """Заполняет базу синтетическими данными для нагрузочных тестов.
+
+    Авторы, подписки, избранное и корзины распределены по Ципфу:
+    немногие авторы и рецепты популярны, остальные - редко. Строки
+    вставляются пакетами bulk_create, сигналы при этом не вызываются,
+    поэтому в конце пересчитываются списки покупок и счетчики.
+    При одинаковом --seed данные получаются одинаковыми."""
+    help = 'Создает пользователей, рецепты, подписки, избранное и корзины.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--follows', type=float, default=10,
+            help='Среднее число подписок на пользователя.')
+        parser.add_argument(
+            '--favorites', type=float, default=20,
+            help='Среднее число рецептов в избранном пользователя.')
+        parser.add_argument(
+            '--carts', type=float, default=5,
+            help='Среднее число рецептов в корзине пользователя.')
+        parser.add_argument(
+            '--ingredients', type=int, nargs=2, default=(3, 12),
+            metavar=('MIN', 'MAX'),
+            help='Число ингредиентов в рецепте.')
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='synthetic',
+            help='Префикс имен пользователей и названий рецептов.')
+        parser.add_argument(
+            '--password', default='synthetic-password',
+            help='Пароль всех созданных пользователей.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        self.batch_size = options['batch_size']
+        if User.objects.filter(
+                username__startswith=f'{self.prefix}_').exists():
+            raise CommandError(
+                f'Данные с префиксом {self.prefix} уже созданы, '
+                'укажите другой --prefix.')
+        if not Ingredients.objects.exists():
+            call_command('load_ingredients', stdout=self.stdout)
+
+        started = time.monotonic()
+        self.step('Пользователи', self.create_users)
+        self.step('Рецепты', self.create_recipes)
+        self.step('Подписки', self.create_relations, Follow, 'follows')
+        self.step('Избранное', self.create_relations, Favorites, 'favorites')
+        self.step('Корзины', self.create_relations, ShoppingList, 'carts')
+        self.step('Списки покупок', call_command,
+                  'rebuild_shopping_lists', stdout=self.stdout)
+        self.step('Счетчики', call_command,
+                  'reconcile_counters', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с.'))
+
+    def step(self, title, function, *args, **kwargs):
+        started = time.monotonic()
+        result = function(*args, **kwargs)
+        message = f'{title}: {time.monotonic() - started:.1f} с'
+        if isinstance(result, int):
+            message += f', строк: {result}'
+        self.stdout.write(message + '.')
+
+    def batches(self, size):
+        for start in range(0, size, self.batch_size):
+            yield range(start, min(start + self.batch_size, size))
+
+    def create_users(self):
+        password = make_password(self.options['password'])
+        self.user_ids = []
+        for batch in self.batches(self.options['users']):
+            users = User.objects.bulk_create(
+                User(
+                    username=f'{self.prefix}_{number}',
+                    email=f'{self.prefix}_{number}@example.com',
+                    first_name='Пользователь',
+                    last_name=str(number),
+                    password=password,
+                )
+                for number in batch
+            )
+            self.user_ids.extend(user.id for user in users)
+        # Популярность авторов не зависит от порядка создания.
+        self.rng.shuffle(self.user_ids)
+        self.user_weights = zipf_weights(
+            len(self.user_ids), self.options['skew'])
+        return len(self.user_ids)
+
+    def get_image(self):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = BytesIO()
+            Image.new('RGB', (480, 320), '#E26C2D').save(buffer, 'PNG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        return IMAGE_NAME
+
+    def get_tags(self):
+        if not Tags.objects.exists():
+            for name, slug, color in DEFAULT_TAGS:
+                Tags.objects.create(name=name, slug=slug, color=color)
+        return list(Tags.objects.order_by('id').values_list('id', flat=True))
+
+    def create_recipes(self):
+        rng, skew = self.rng, self.options['skew']
+        image = self.get_image()
+        tag_ids = self.get_tags()
+        ingredients = list(
+            Ingredients.objects.order_by('id').values_list('id', 'name'))
+        rng.shuffle(ingredients)
+        ingredient_weights = zipf_weights(len(ingredients), skew)
+        min_ingredients, max_ingredients = self.options['ingredients']
+        self.recipe_ids = []
+        rows = 0
+        for batch in self.batches(self.options['recipes']):
+            contents = []
+            for _ in batch:
+                count = rng.randint(min_ingredients, max_ingredients)
+                picked = dict.fromkeys(rng.choices(
+                    ingredients, cum_weights=ingredient_weights,
+                    k=count * 2))
+                contents.append((
+                    list(picked)[:count],
+                    rng.sample(tag_ids, rng.randint(1, len(tag_ids))),
+                ))
+            authors = rng.choices(
+                self.user_ids, cum_weights=self.user_weights, k=len(batch))
+            with transaction.atomic():
+                recipes = Recipes.objects.bulk_create(
+                    Recipes(
+                        name=f'{self.prefix} рецепт {number}',
+                        text='Смешать: ' + ', '.join(
+                            name for _, name in recipe_ingredients) + '.',
+                        author_id=author_id,
+                        cooking_time=rng.randint(5, 180),
+                        image=image,
+                    )
+                    for number, author_id, (recipe_ingredients, _) in zip(
+                        batch, authors, contents)
+                )
+                links = RecipesIngredients.objects.bulk_create(
+                    RecipesIngredients(
+                        recipe_id=recipe,
+                        ingredient_id_id=ingredient_id,
+                        amount=rng.randint(1, 500),
+                    )
+                    for recipe, (recipe_ingredients, _) in zip(
+                        recipes, contents)
+                    for ingredient_id, _ in recipe_ingredients
+                )
+                tags = RecipesTags.objects.bulk_create(
+                    RecipesTags(recipe_id=recipe, tag_id_id=tag_id)
+                    for recipe, (_, recipe_tags) in zip(recipes, contents)
+                    for tag_id in recipe_tags
+                )
+                Recipes.objects.filter(
+                    pk__in=[recipe.pk for recipe in recipes]
+                ).update_search_vector()
+            self.recipe_ids.extend(recipe.pk for recipe in recipes)
+            rows += len(recipes) + len(links) + len(tags)
+        self.rng.shuffle(self.recipe_ids)
+        self.recipe_weights = zipf_weights(len(self.recipe_ids), skew)
+        return rows
+
+    def pick(self, model, average):
+        """Для каждого пользователя выбирает число связей (в среднем
+        average) и популярных по Ципфу авторов или рецептов."""
+        rng = self.rng
+        if model is Follow:
+            population, weights = self.user_ids, self.user_weights
+        else:
+            population, weights = self.recipe_ids, self.recipe_weights
+        for user_id in sorted(self.user_ids):
+            count = min(int(rng.expovariate(1 / average)), len(population))
+            if not count:
+                continue
+            targets = dict.fromkeys(
+                rng.choices(population, cum_weights=weights, k=count))
+            if model is Follow:
+                # Подписаться на себя нельзя.
+                targets.pop(user_id, None)
+            for target_id in targets:
+                if model is Follow:
+                    yield Follow(user_id=user_id, author_id=target_id)
+                else:
+                    yield model(user_id=user_id, recipe_id_id=target_id)
+
+    def create_relations(self, model, option):
+        if not self.options[option]:
+            return 0
+        rows = 0
+        objects = self.pick(model, self.options[option])
+        while True:
+            batch = [obj for _, obj in zip(range(self.batch_size), objects)]
+            if not batch:
+                return rows
+            model.objects.bulk_create(batch)
+            rows += len(batch)
@@ -0,0 +1,153 @@
+import csv
+import json
+import time
+from io import StringIO
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.utils.ingredients_index import ingredients_index
+from recipes.models import Ingredients, TableVersion
+
+FORMATS = ('csv', 'json')
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if len(row) < 2 or row[:2] == ['name', 'measurement_unit']:
+            continue
+        yield row[0], row[1]
+
+
+def read_json(file):
+    for item in json.load(file):
+        yield item['name'], item['measurement_unit']
+
+
+def normalize(name, measurement_unit):
+    """Убирает лишние пробелы, название приводится к нижнему регистру."""
+    return ' '.join(name.split()).lower(), ' '.join(measurement_unit.split())
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    """Загружает ингредиенты из data/ingredients.csv или .json.
+
+    В PostgreSQL строки передаются командой COPY во временную таблицу
+    и переносятся одним INSERT ... ON CONFLICT DO NOTHING, на других
+    базах - пакетами bulk_create(ignore_conflicts=True). Уже
+    существующие пары (название, единица измерения) пропускаются,
+    поэтому команду можно запускать повторно."""
+    help = 'Загружает ингредиенты из файла csv или json.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=settings.INGREDIENTS_DATA_DIR / 'ingredients.csv',
+            type=Path,
+            help='Путь к файлу (по умолчанию data/ingredients.csv).',
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла, если он не следует из расширения.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.INGREDIENTS_LOAD_CHUNK_SIZE,
+            help='Количество строк в одном пакете.',
+        )
+
+    def read_rows(self, file, format):
+        """Построчно читает файл и отбрасывает пустые и слишком
+        длинные значения."""
+        reader = read_csv if format == 'csv' else read_json
+        max_name = Ingredients._meta.get_field('name').max_length
+        max_unit = Ingredients._meta.get_field(
+            'measurement_unit').max_length
+        for name, measurement_unit in reader(file):
+            self.total += 1
+            name, measurement_unit = normalize(name, measurement_unit)
+            if (not name or not measurement_unit
+                    or len(name) > max_name
+                    or len(measurement_unit) > max_unit):
+                self.invalid += 1
+                continue
+            yield name, measurement_unit
+
+    def copy_rows(self, rows, chunk_size):
+        """Загрузка через COPY. Возвращает количество новых строк."""
+        quote = connection.ops.quote_name
+        table = quote(Ingredients._meta.db_table)
+        name = quote(Ingredients._meta.get_field('name').column)
+        unit = quote(
+            Ingredients._meta.get_field('measurement_unit').column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredients_load '
+                '(name text, measurement_unit text) ON COMMIT DROP')
+            for chunk in chunked(rows, chunk_size):
+                buffer = StringIO()
+                csv.writer(buffer).writerows(chunk)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredients_load FROM STDIN WITH (FORMAT csv)',
+                    buffer)
+            cursor.execute(
+                f'INSERT INTO {table} ({name}, {unit}) '
+                'SELECT name, measurement_unit FROM ingredients_load '
+                f'ON CONFLICT ({name}, {unit}) DO NOTHING')
+            return cursor.rowcount
+
+    def bulk_create_rows(self, rows, chunk_size):
+        """Загрузка через bulk_create. Возвращает количество новых
+        строк."""
+        before = Ingredients.objects.count()
+        for chunk in chunked(rows, chunk_size):
+            Ingredients.objects.bulk_create(
+                (Ingredients(name=name, measurement_unit=measurement_unit)
+                 for name, measurement_unit in chunk),
+                ignore_conflicts=True,
+            )
+        return Ingredients.objects.count() - before
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or path.suffix.lstrip('.').lower()
+        if format not in FORMATS:
+            raise CommandError(
+                f'Неизвестный формат файла {path.name}, '
+                f'укажите --format ({", ".join(FORMATS)}).')
+        if not path.is_file():
+            raise CommandError(f'Файл {path} не найден.')
+
+        self.total = self.invalid = 0
+        started = time.monotonic()
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = self.read_rows(file, format)
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    inserted = self.copy_rows(rows, options['chunk_size'])
+                else:
+                    inserted = self.bulk_create_rows(
+                        rows, options['chunk_size'])
+                # Массовая загрузка не вызывает сигналы моделей.
+                if inserted:
+                    TableVersion.objects.bump(Ingredients)
+                    transaction.on_commit(ingredients_index.invalidate)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {self.total}, добавлено: {inserted}, '
+            f'пропущено: {self.total - self.invalid - inserted}, '
+            f'с ошибками: {self.invalid}. Время: {elapsed:.2f} с.'))
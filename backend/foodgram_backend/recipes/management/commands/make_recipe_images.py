@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import RENDITIONS, make_renditions
+from recipes.models import Recipes
+
+
+class Command(BaseCommand):
+    """Создает уменьшенные копии фото для рецептов, у которых
+    их еще нет (например, добавленных до появления обработки)."""
+    help = 'Создает уменьшенные копии фото рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать копии для всех рецептов.',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipes.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(**{field: '' for field in RENDITIONS})
+        recipe_ids = list(recipes.values_list('id', flat=True))
+        for recipe_id in recipe_ids:
+            make_renditions(recipe_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано рецептов: {len(recipe_ids)}.'))
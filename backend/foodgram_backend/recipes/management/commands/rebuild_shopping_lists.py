@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import RecipesIngredients, ShoppingListIngredients
+
+
+class Command(BaseCommand):
+    """Пересчитывает или проверяет суммарные списки покупок
+    (ShoppingListIngredients) по корзинам пользователей."""
+    help = ('Пересчитывает суммы ингредиентов в списках покупок. '
+            'С флагом --verify только сравнивает их с корзинами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только проверить списки покупок, не изменяя их.',
+        )
+
+    def get_expected(self):
+        """Суммы ингредиентов, посчитанные заново по корзинам."""
+        totals = RecipesIngredients.objects.filter(
+            recipe_id__in_shopping_cart__isnull=False
+        ).values_list(
+            'recipe_id__in_shopping_cart__user', 'ingredient_id'
+        ).annotate(total_amount=Sum('amount')).order_by()
+        return {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in totals.iterator()
+        }
+
+    def handle(self, *args, **options):
+        expected = self.get_expected()
+        if options['verify']:
+            actual = {
+                (user_id, ingredient_id): amount
+                for user_id, ingredient_id, amount in
+                ShoppingListIngredients.objects.values_list(
+                    'user_id', 'ingredient_id', 'amount').iterator()
+            }
+            mismatches = [
+                key for key in expected.keys() | actual.keys()
+                if expected.get(key) != actual.get(key)
+            ]
+            for user_id, ingredient_id in mismatches[:20]:
+                self.stdout.write(
+                    f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                    f'ожидается {expected.get((user_id, ingredient_id))}, '
+                    f'в списке {actual.get((user_id, ingredient_id))}.')
+            if mismatches:
+                raise CommandError(
+                    f'Расхождений в списках покупок: {len(mismatches)}.')
+            self.stdout.write(self.style.SUCCESS(
+                'Списки покупок совпадают с корзинами.'))
+            return
+
+        with transaction.atomic():
+            ShoppingListIngredients.objects.all().delete()
+            ShoppingListIngredients.objects.bulk_create(
+                (ShoppingListIngredients(
+                    user_id=user_id,
+                    ingredient_id_id=ingredient_id,
+                    amount=amount,
+                ) for (user_id, ingredient_id), amount in expected.items()),
+                batch_size=1000,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересчитаны, строк: {len(expected)}.'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    """Сверяет денормализованные счетчики рецептов и пользователей
+    с таблицами избранного, корзин, рецептов и подписок."""
+    help = ('Сверяет счетчики избранного, корзин, рецептов и подписчиков '
+            'с фактическими данными и исправляет расхождения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, сколько строк расходится.',
+        )
+
+    def handle(self, *args, **options):
+        result = reconcile_counters(dry_run=options['dry_run'])
+        for name, count in result.items():
+            self.stdout.write(f'{name}: {count}')
+        if options['dry_run']:
+            self.stdout.write('Изменения не сохранены.')
+        else:
+            self.stdout.write(self.style.SUCCESS('Счетчики сверены.'))
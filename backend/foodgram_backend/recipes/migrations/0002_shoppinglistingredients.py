@@ -0,0 +1,65 @@
+# Generated by Django 4.2.1 on 2026-10-18 09:32
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def fill_shopping_list_ingredients(apps, schema_editor):
+    RecipesIngredients = apps.get_model('recipes', 'RecipesIngredients')
+    ShoppingListIngredients = apps.get_model(
+        'recipes', 'ShoppingListIngredients')
+    totals = RecipesIngredients.objects.filter(
+        recipe_id__in_shopping_cart__isnull=False
+    ).values(
+        'recipe_id__in_shopping_cart__user', 'ingredient_id'
+    ).annotate(total_amount=Sum('amount')).order_by()
+    ShoppingListIngredients.objects.bulk_create(
+        (ShoppingListIngredients(
+            user_id=item['recipe_id__in_shopping_cart__user'],
+            ingredient_id_id=item['ingredient_id'],
+            amount=item['total_amount'],
+        ) for item in totals.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipes',
+            name='ingredients',
+            field=models.ManyToManyField(related_name='recepies', through='recipes.RecipesIngredients', to='recipes.ingredients', verbose_name='Ингредиент'),
+        ),
+        migrations.AlterField(
+            model_name='recipes',
+            name='tags',
+            field=models.ManyToManyField(related_name='recepies', through='recipes.RecipesTags', to='recipes.tags', verbose_name='Тег'),
+        ),
+        migrations.CreateModel(
+            name='ShoppingListIngredients',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(help_text='Суммарное количество ингредиента', verbose_name='Количество')),
+                ('ingredient_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.ingredients', verbose_name='id ингредиента')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_ingredients', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Ингредиенты в списке покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistingredients',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient_id'), name='unique_shopping_list_ingredient'),
+        ),
+        migrations.RunPython(
+            fill_shopping_list_ingredients, migrations.RunPython.noop),
+    ]
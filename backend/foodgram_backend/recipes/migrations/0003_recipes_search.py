@@ -0,0 +1,52 @@
+# Generated by Django 4.2.1 on 2026-10-18 09:35
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, transaction
+from django.db.models import Max
+
+CHUNK_SIZE = 1000
+
+
+def fill_search_vector(apps, schema_editor):
+    """Заполняет поисковый вектор порциями по id, каждая порция -
+    отдельная транзакция, чтобы не держать блокировку всей таблицы."""
+    Recipes = apps.get_model('recipes', 'Recipes')
+    last_id = Recipes.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    for start in range(0, last_id + 1, CHUNK_SIZE):
+        with transaction.atomic():
+            Recipes.objects.filter(
+                id__gte=start, id__lt=start + CHUNK_SIZE
+            ).update(search_vector=(
+                SearchVector('name', weight='A', config='russian')
+                + SearchVector('text', weight='B', config='russian')
+            ))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0002_shoppinglistingredients'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='recipes',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipes_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='recipes_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.1 on 2026-10-18 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_tableversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='image_card',
+            field=models.ImageField(blank=True, editable=False, upload_to='', verbose_name='Фото для карточки'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='image_detail',
+            field=models.ImageField(blank=True, editable=False, upload_to='', verbose_name='Фото для страницы рецепта'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='image_webp',
+            field=models.ImageField(blank=True, editable=False, upload_to='', verbose_name='Фото для карточки (WebP)'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.1 on 2026-10-18 09:38
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Сливает повторы ингредиента в рецепте (их оставляла старая
+    форма админки) в одну строку с суммой количеств, иначе уникальный
+    индекс не построится. Суммы в списках покупок не меняются."""
+    RecipesIngredients = apps.get_model('recipes', 'RecipesIngredients')
+    duplicates = RecipesIngredients.objects.values(
+        'recipe_id', 'ingredient_id'
+    ).annotate(
+        keep_id=Min('id'), total=Sum('amount'), rows=Count('id')
+    ).filter(rows__gt=1).order_by()
+    for item in duplicates.iterator():
+        RecipesIngredients.objects.filter(
+            pk=item['keep_id']).update(amount=item['total'])
+        RecipesIngredients.objects.filter(
+            recipe_id=item['recipe_id'],
+            ingredient_id=item['ingredient_id'],
+        ).exclude(pk=item['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0005_recipes_image_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop,
+            atomic=True),
+        # Уникальный индекс строится без блокировки записи, после чего
+        # ограничение подключается к готовому индексу.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS '
+                    'unique_recipe_ingredient ON recipes_recipesingredients '
+                    '(recipe_id_id, ingredient_id_id);',
+                    'DROP INDEX CONCURRENTLY IF EXISTS '
+                    'unique_recipe_ingredient;',
+                ),
+                migrations.RunSQL(
+                    'ALTER TABLE recipes_recipesingredients ADD CONSTRAINT '
+                    'unique_recipe_ingredient UNIQUE '
+                    'USING INDEX unique_recipe_ingredient;',
+                    'ALTER TABLE recipes_recipesingredients '
+                    'DROP CONSTRAINT unique_recipe_ingredient;',
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='recipesingredients',
+                    constraint=models.UniqueConstraint(fields=('recipe_id', 'ingredient_id'), name='unique_recipe_ingredient'),
+                ),
+            ],
+        ),
+    ]
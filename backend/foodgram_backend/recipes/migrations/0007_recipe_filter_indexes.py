@@ -0,0 +1,24 @@
+# Generated by Django 4.2.1 on 2026-10-18 09:41
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0006_unique_recipe_ingredient'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='recipes',
+            index=models.Index(fields=['cooking_time'], name='recipes_cooking_time_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='recipestags',
+            index=models.Index(fields=['tag_id', 'recipe_id'], name='recipes_tag_recipe_idx'),
+        ),
+    ]
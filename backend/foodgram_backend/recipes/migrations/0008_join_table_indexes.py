@@ -0,0 +1,68 @@
+# Generated by Django 4.2.1 on 2026-10-18 09:42
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicate_tags(apps, schema_editor):
+    """Оставляет по одной строке на пару (рецепт, тег), иначе
+    уникальный индекс не построится."""
+    RecipesTags = apps.get_model('recipes', 'RecipesTags')
+    keep = RecipesTags.objects.values(
+        'recipe_id', 'tag_id').annotate(keep_id=Min('id')).values('keep_id')
+    RecipesTags.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0007_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='favorites',
+            index=models.Index(fields=['user', 'recipe_id'], name='favorites_user_recipe_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='recipes',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipes_pub_date_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='recipes',
+            index=models.Index(fields=['author', '-pub_date'], name='recipes_author_pub_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='shoppinglist',
+            index=models.Index(fields=['user', 'recipe_id'], name='shopping_list_user_recipe_idx'),
+        ),
+        migrations.RunPython(
+            delete_duplicate_tags, migrations.RunPython.noop),
+        # Уникальный индекс строится без блокировки записи, после чего
+        # ограничение подключается к готовому индексу.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS '
+                    'unique_recipe_tag ON recipes_recipestags '
+                    '(recipe_id_id, tag_id_id);',
+                    'DROP INDEX CONCURRENTLY IF EXISTS unique_recipe_tag;',
+                ),
+                migrations.RunSQL(
+                    'ALTER TABLE recipes_recipestags ADD CONSTRAINT '
+                    'unique_recipe_tag UNIQUE USING INDEX unique_recipe_tag;',
+                    'ALTER TABLE recipes_recipestags '
+                    'DROP CONSTRAINT unique_recipe_tag;',
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='recipestags',
+                    constraint=models.UniqueConstraint(fields=('recipe_id', 'tag_id'), name='unique_recipe_tag'),
+                ),
+            ],
+        ),
+    ]
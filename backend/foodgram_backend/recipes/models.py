@@ -1,5 +1,13 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.core.cache import cache
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import (Case, Exists, F, OuterRef, Prefetch, Value,
+                              When, Window)
+from django.db.models.functions import Greatest, RowNumber
+from django.utils import timezone
 
 from users.models import User
 from .validators import HEX_VALIDATOR
@@ -62,6 +70,61 @@ class Tags(models.Model):
         verbose_name_plural = 'Теги'
 
 
+class RecipesQuerySet(models.QuerySet):
+    """Набор запросов для рецептов."""
+
+    def with_related(self):
+        """Подгружает автора, теги и ингредиенты (вместе с количеством)
+        для всей выборки фиксированным числом запросов."""
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipesingredients_set',
+                queryset=RecipesIngredients.objects.select_related(
+                    'ingredient_id').order_by('ingredient_id__name'),
+            ),
+        )
+
+    def limited_per_author(self, authors, limit=None):
+        """Последние рецепты авторов одним запросом: не более limit
+        рецептов на каждого автора (ROW_NUMBER по автору)."""
+        queryset = self.filter(author__in=authors)
+        if limit is None:
+            return queryset
+        return queryset.annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=F('pub_date').desc(),
+            )
+        ).filter(row_number__lte=limit)
+
+    def update_search_vector(self):
+        """Пересчитывает поисковый вектор рецептов:
+        название с весом A, описание с весом B."""
+        return self.update(search_vector=(
+            SearchVector('name', weight='A',
+                         config=settings.RECIPES_SEARCH_CONFIG)
+            + SearchVector('text', weight='B',
+                           config=settings.RECIPES_SEARCH_CONFIG)
+        ))
+
+    def with_user_flags(self, user):
+        """Добавляет признаки is_favorited и is_in_shopping_cart
+        для пользователя одним запросом на всю выборку."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorites.objects.filter(
+                user=user, recipe_id=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingList.objects.filter(
+                user=user, recipe_id=OuterRef('pk'))),
+        )
+
+
 class Recipes(models.Model):
     """Модель рецептов."""
     name = models.CharField(
@@ -93,6 +156,21 @@ class Recipes(models.Model):
         upload_to='recipes/images/',
         help_text='Фото блюда',
     )
+    image_card = models.ImageField(
+        'Фото для карточки',
+        blank=True,
+        editable=False,
+    )
+    image_detail = models.ImageField(
+        'Фото для страницы рецепта',
+        blank=True,
+        editable=False,
+    )
+    image_webp = models.ImageField(
+        'Фото для карточки (WebP)',
+        blank=True,
+        editable=False,
+    )
     pub_date = models.DateTimeField(
         verbose_name='Дата публикации',
         auto_now_add=True,
@@ -109,6 +187,23 @@ class Recipes(models.Model):
         verbose_name='Тег',
         related_name='recepies',
     )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        'Сколько в избранных',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'Сколько в списках покупок',
+        default=0,
+        editable=False,
+    )
+
+    objects = RecipesQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.name
@@ -117,6 +212,29 @@ class Recipes(models.Model):
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipes_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipes_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['cooking_time'],
+                name='recipes_cooking_time_idx',
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='recipes_search_vector_idx',
+            ),
+            GinIndex(
+                fields=['name'],
+                name='recipes_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
 
 
 class RecipesIngredients(models.Model):
@@ -144,6 +262,12 @@ class RecipesIngredients(models.Model):
     class Meta:
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецепте'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe_id', 'ingredient_id'],
+                name='unique_recipe_ingredient',
+            )
+        ]
 
 
 class RecipesTags(models.Model):
@@ -165,6 +289,18 @@ class RecipesTags(models.Model):
     class Meta:
         verbose_name = 'Тег рецепта'
         verbose_name_plural = 'Теги рецепта'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe_id', 'tag_id'],
+                name='unique_recipe_tag',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['tag_id', 'recipe_id'],
+                name='recipes_tag_recipe_idx',
+            ),
+        ]
 
 
 class Favorites(models.Model):
@@ -195,6 +331,12 @@ class Favorites(models.Model):
                 name='unique_favorite_recipe_user',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe_id'],
+                name='favorites_user_recipe_idx',
+            ),
+        ]
 
 
 class ShoppingList(models.Model):
@@ -225,3 +367,196 @@ class ShoppingList(models.Model):
                 name='unique_shopping_cart',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe_id'],
+                name='shopping_list_user_recipe_idx',
+            ),
+        ]
+
+
+class ShoppingListIngredientsQuerySet(models.QuerySet):
+    """Набор запросов для суммарного списка покупок."""
+
+    def apply(self, user_ids, amounts):
+        """Изменяет суммы ингредиентов в списках покупок пользователей.
+        amounts - словарь {id ингредиента: изменение количества}."""
+        amounts = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items() if amount
+        }
+        user_ids = sorted(set(user_ids))
+        if not amounts or not user_ids:
+            return
+        with transaction.atomic():
+            self._increase(user_ids, {
+                ingredient_id: amount
+                for ingredient_id, amount in amounts.items() if amount > 0
+            })
+            self._decrease(user_ids, {
+                ingredient_id: -amount
+                for ingredient_id, amount in amounts.items() if amount < 0
+            })
+
+    def _increase(self, user_ids, amounts):
+        """INSERT ... ON CONFLICT DO UPDATE: строку, которую параллельно
+        вставила другая транзакция, база дополнит, а не отвергнет
+        с нарушением unique_shopping_list_ingredient. Строки идут
+        в одном порядке, чтобы транзакции не блокировали друг друга
+        взаимно."""
+        if not amounts:
+            return
+        meta = self.model._meta
+        quote = connection.ops.quote_name
+        table = quote(meta.db_table)
+        user = quote(meta.get_field('user').column)
+        ingredient = quote(meta.get_field('ingredient_id').column)
+        amount = quote(meta.get_field('amount').column)
+        rows = [
+            (user_id, ingredient_id, amounts[ingredient_id])
+            for user_id in user_ids for ingredient_id in sorted(amounts)
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({user}, {ingredient}, {amount}) '
+                f'VALUES {", ".join(["(%s, %s, %s)"] * len(rows))} '
+                f'ON CONFLICT ({user}, {ingredient}) DO UPDATE '
+                f'SET {amount} = {table}.{amount} + EXCLUDED.{amount}',
+                [value for row in rows for value in row],
+            )
+
+    def _decrease(self, user_ids, amounts):
+        """Уменьшает суммы одним UPDATE и удаляет обнулившиеся строки."""
+        if not amounts:
+            return
+        items = self.filter(user_id__in=user_ids, ingredient_id__in=amounts)
+        items.update(amount=Greatest(F('amount') - Case(
+            *(When(ingredient_id=ingredient_id, then=Value(amount))
+              for ingredient_id, amount in amounts.items()),
+            output_field=models.PositiveIntegerField(),
+        ), 0))
+        items.filter(amount=0).delete()
+
+    def add_recipe(self, user_ids, recipe, sign=1):
+        """Добавляет ингредиенты рецепта в списки покупок
+        пользователей (sign=-1 - удаляет)."""
+        amounts = RecipesIngredients.objects.filter(
+            recipe_id=recipe).values_list('ingredient_id', 'amount')
+        self.apply(user_ids, {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in amounts
+        })
+
+    def remove_recipe(self, user_ids, recipe):
+        """Удаляет ингредиенты рецепта из списков покупок
+        пользователей."""
+        self.add_recipe(user_ids, recipe, sign=-1)
+
+
+class ShoppingListIngredients(models.Model):
+    """Суммарное количество ингредиентов в списке покупок
+    пользователя. Обновляется сигналами при изменении корзины
+    и ингредиентов рецептов из корзины, пересчитывается командой
+    rebuild_shopping_lists."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_ingredients',
+        verbose_name='Пользователь',
+    )
+    ingredient_id = models.ForeignKey(
+        Ingredients,
+        on_delete=models.CASCADE,
+        verbose_name='id ингредиента',
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество',
+        help_text='Суммарное количество ингредиента',
+    )
+
+    objects = ShoppingListIngredientsQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return (f'В списке покупок {self.user}: '
+                f'{self.ingredient_id} - {self.amount}.')
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списке покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient_id'],
+                name='unique_shopping_list_ingredient',
+            )
+        ]
+
+
+class TableVersionQuerySet(models.QuerySet):
+    """Набор запросов для версий справочных таблиц."""
+
+    @staticmethod
+    def get_cache_key(model):
+        return f'table-version:{model._meta.label_lower}'
+
+    def get_for(self, model):
+        """Возвращает версию таблицы модели, создавая ее при
+        первом обращении. Версия кешируется на TABLE_VERSION_CACHE_TTL
+        секунд, чтобы условные запросы и автодополнение не обращались
+        к базе; bump сбрасывает кеш."""
+        key = self.get_cache_key(model)
+        table_version = cache.get(key)
+        if table_version is None:
+            table_version = self.get_or_create(
+                table=model._meta.label_lower)[0]
+            cache.set(key, table_version, settings.TABLE_VERSION_CACHE_TTL)
+        return table_version
+
+    async def aget_for(self, model):
+        """Асинхронный вариант get_for."""
+        key = self.get_cache_key(model)
+        table_version = await cache.aget(key)
+        if table_version is None:
+            table_version = (await self.aget_or_create(
+                table=model._meta.label_lower))[0]
+            await cache.aset(
+                key, table_version, settings.TABLE_VERSION_CACHE_TTL)
+        return table_version
+
+    def bump(self, model):
+        """Увеличивает версию таблицы модели после изменения данных.
+        Кеш сбрасывается сразу и еще раз после фиксации транзакции:
+        иначе параллельный запрос успел бы закешировать старую версию."""
+        table = model._meta.label_lower
+        if not self.filter(table=table).update(
+                version=F('version') + 1, updated_at=timezone.now()):
+            self.get_or_create(table=table, defaults={'version': 1})
+        key = self.get_cache_key(model)
+        cache.delete(key)
+        transaction.on_commit(lambda: cache.delete(key))
+
+
+class TableVersion(models.Model):
+    """Счетчик изменений справочной таблицы (теги, ингредиенты).
+    Используется для ETag и Last-Modified ответов API."""
+    table = models.CharField(
+        'Таблица',
+        max_length=100,
+        unique=True,
+    )
+    version = models.PositiveBigIntegerField(
+        'Версия',
+        default=0,
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
+
+    objects = TableVersionQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return f'{self.table}: {self.version}'
+
+    class Meta:
+        verbose_name = 'Версия таблицы'
+        verbose_name_plural = 'Версии таблиц'
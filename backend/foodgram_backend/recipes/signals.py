@@ -0,0 +1,140 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from import_export.signals import post_import
+
+from users.models import Follow
+from .counters import change_counters
+from .models import (Favorites, Ingredients, Recipes, RecipesIngredients,
+                     ShoppingList, ShoppingListIngredients, TableVersion,
+                     Tags)
+
+REFERENCE_MODELS = (Ingredients, Tags)
+
+# Включается кодом, который сам переносит изменения ингредиентов
+# рецепта в списки покупок одним вызовом apply.
+shopping_lists_applied = ContextVar('shopping_lists_applied', default=False)
+
+
+@receiver(post_save, sender=Ingredients)
+@receiver(post_save, sender=Tags)
+@receiver(post_delete, sender=Ingredients)
+@receiver(post_delete, sender=Tags)
+def bump_table_version(sender, **kwargs):
+    """Изменение тега или ингредиента, в том числе из админки."""
+    TableVersion.objects.bump(sender)
+
+
+@receiver(post_import)
+def bump_table_version_after_import(sender, model, **kwargs):
+    """Импорт через django-import-export."""
+    if model in REFERENCE_MODELS:
+        TableVersion.objects.bump(model)
+
+
+@receiver(post_save, sender=Recipes)
+def update_search_vector(sender, instance, update_fields=None, **kwargs):
+    """Поисковый вектор пересчитывается при любом сохранении названия
+    или описания: из API, админки или shell. Пакетные вставки
+    (generate_dataset) пересчитывают его сами."""
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        Recipes.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Favorites)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_save, sender=Recipes)
+@receiver(post_save, sender=Follow)
+def increment_counters(sender, instance, created, **kwargs):
+    """Добавление в избранное или корзину, новый рецепт, подписка."""
+    if created:
+        change_counters(instance, 1)
+
+
+@receiver(post_delete, sender=Favorites)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_delete, sender=Recipes)
+@receiver(post_delete, sender=Follow)
+def decrement_counters(sender, instance, **kwargs):
+    """Удаление, в том числе каскадное."""
+    change_counters(instance, -1)
+
+
+@contextmanager
+def apply_shopping_lists_manually():
+    """Отключает построчные обработчики RecipesIngredients: пакетное
+    изменение рецепта переносит разницу в списки покупок само."""
+    token = shopping_lists_applied.set(True)
+    try:
+        yield
+    finally:
+        shopping_lists_applied.reset(token)
+
+
+def change_shopping_lists(recipe_id, ingredient_id, amount):
+    """Переносит изменение количества ингредиента рецепта в списки
+    покупок пользователей, у которых рецепт в корзине."""
+    if shopping_lists_applied.get():
+        return
+    ShoppingListIngredients.objects.apply(
+        ShoppingList.objects.filter(
+            recipe_id=recipe_id).values_list('user_id', flat=True),
+        {ingredient_id: amount},
+    )
+
+
+@receiver(pre_save, sender=ShoppingList)
+@receiver(pre_save, sender=RecipesIngredients)
+def remember_saved_row(sender, instance, **kwargs):
+    """Запоминает строку в базе до изменения, например из админки."""
+    instance._saved_row = None
+    if instance.pk is not None:
+        instance._saved_row = sender.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=ShoppingList)
+def add_to_shopping_list(sender, instance, **kwargs):
+    """Рецепт добавлен в корзину или строка корзины изменена."""
+    old = getattr(instance, '_saved_row', None)
+    if old is not None:
+        if (old.user_id, old.recipe_id_id) == (
+                instance.user_id, instance.recipe_id_id):
+            return
+        ShoppingListIngredients.objects.remove_recipe(
+            [old.user_id], old.recipe_id_id)
+    ShoppingListIngredients.objects.add_recipe(
+        [instance.user_id], instance.recipe_id_id)
+
+
+@receiver(post_delete, sender=ShoppingList)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    """Удаление из корзины, в том числе каскадное. Если ингредиенты
+    рецепта уже удалены, их вычел remove_recipe_ingredient."""
+    ShoppingListIngredients.objects.remove_recipe(
+        [instance.user_id], instance.recipe_id_id)
+
+
+@receiver(post_save, sender=RecipesIngredients)
+def save_recipe_ingredient(sender, instance, **kwargs):
+    """Ингредиент рецепта добавлен или изменен, например из админки."""
+    old = getattr(instance, '_saved_row', None)
+    amount = instance.amount
+    if old is not None:
+        if (old.recipe_id_id, old.ingredient_id_id) == (
+                instance.recipe_id_id, instance.ingredient_id_id):
+            amount -= old.amount
+        else:
+            change_shopping_lists(
+                old.recipe_id_id, old.ingredient_id_id, -old.amount)
+    change_shopping_lists(
+        instance.recipe_id_id, instance.ingredient_id_id, amount)
+
+
+@receiver(post_delete, sender=RecipesIngredients)
+def remove_recipe_ingredient(sender, instance, **kwargs):
+    """Удаление ингредиента рецепта, в том числе каскадное. Если рецепт
+    уже удален из корзин, его вычел remove_from_shopping_list."""
+    change_shopping_lists(
+        instance.recipe_id_id, instance.ingredient_id_id, -instance.amount)
@@ -0,0 +1,107 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import IngredientsViewSet, RecipesViewSet, TagsViewSet
+from recipes.models import Ingredients, Tags
+
+# Вьюсет, действия, путь запроса и аргументы из URL.
+CASES = {
+    'tags-list': (TagsViewSet, {'get': 'list'}, '/api/tags/', {}),
+    'tags-detail': (
+        TagsViewSet, {'get': 'retrieve'}, '/api/tags/{tag}/',
+        {'pk': '{tag}'}),
+    'ingredients-list': (
+        IngredientsViewSet, {'get': 'list'}, '/api/ingredients/', {}),
+    'ingredients-search': (
+        IngredientsViewSet, {'get': 'list'}, '/api/ingredients/?name=мол',
+        {}),
+    'ingredients-detail': (
+        IngredientsViewSet, {'get': 'retrieve'},
+        '/api/ingredients/{ingredient}/', {'pk': '{ingredient}'}),
+    'recipes-list': (
+        RecipesViewSet, {'get': 'list'}, '/api/recipes/?limit=6&page=2', {}),
+    'recipes-cursor': (
+        RecipesViewSet, {'get': 'list'},
+        '/api/recipes/?pagination=cursor&limit=6', {}),
+    'recipes-filter': (
+        RecipesViewSet, {'get': 'list'},
+        '/api/recipes/?limit=6&is_in_shopping_cart=1', {}),
+    'recipes-detail': (
+        RecipesViewSet, {'get': 'retrieve'}, '/api/recipes/{recipe}/',
+        {'pk': '{recipe}'}),
+    'recipes-missing': (
+        RecipesViewSet, {'get': 'retrieve'}, '/api/recipes/0/',
+        {'pk': '0'}),
+    'shopping-cart': (
+        RecipesViewSet, {'get': 'download_shopping_cart'},
+        '/api/recipes/download_shopping_cart/?format=txt', {}),
+}
+
+
+async def aread(response):
+    return b''.join([part async for part in response.streaming_content])
+
+
+def request(dataset, name, async_views, **headers):
+    """Выполняет запрос вьюсетом, созданным при заданном ASYNC_VIEWS,
+    и возвращает ответ с прочитанным телом."""
+    viewset, actions, path, kwargs = CASES[name]
+    ids = {
+        'tag': Tags.objects.order_by('id').first().id,
+        'ingredient': Ingredients.objects.order_by('id').first().id,
+        'recipe': dataset.recipe.id,
+    }
+    kwargs = {key: value.format(**ids) for key, value in kwargs.items()}
+    cache.clear()
+    with override_settings(ASYNC_VIEWS=async_views):
+        # Как роутер: параметры @action (renderer_classes и т. д.).
+        action = getattr(viewset, actions['get'])
+        view = viewset.as_view(actions, **getattr(action, 'kwargs', {}))
+        http_request = APIRequestFactory().get(path.format(**ids), **headers)
+        force_authenticate(http_request, dataset.user)
+        if async_views:
+            response = async_to_sync(view)(http_request, **kwargs)
+        else:
+            response = view(http_request, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        if response.streaming:
+            if response.is_async:
+                body = async_to_sync(aread)(response)
+            else:
+                body = b''.join(response.streaming_content)
+        else:
+            body = response.content
+    return response, body
+
+
+@pytest.mark.parametrize('name', CASES)
+def test_async_views_match_sync(dataset, name):
+    """Под ASGI вьюсеты отвечают так же, как под WSGI."""
+    sync_response, sync_body = request(dataset, name, async_views=False)
+    async_response, async_body = request(dataset, name, async_views=True)
+
+    assert async_response.status_code == sync_response.status_code
+    assert async_body == sync_body
+    assert async_response.get('ETag') == sync_response.get('ETag')
+    assert async_response.get('Content-Type') == sync_response.get(
+        'Content-Type')
+    if name == 'shopping-cart':
+        assert sync_body and not sync_response.is_async
+        assert async_response.is_async
+
+
+@pytest.mark.parametrize('name', [
+    name for name in CASES if name.startswith(('tags', 'ingredients'))])
+def test_async_views_not_modified(dataset, name):
+    """Справочники отвечают 304 на If-None-Match в обоих режимах."""
+    response, _ = request(dataset, name, async_views=False)
+    etag = response['ETag']
+    for async_views in (False, True):
+        response, body = request(
+            dataset, name, async_views, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert not body
@@ -0,0 +1,35 @@
+import pytest
+from django.core.files.storage import default_storage
+
+from recipes import images
+from recipes.images import RENDITIONS, make_renditions
+from recipes.models import Recipes
+
+
+@pytest.fixture(autouse=True)
+def keep_connection(monkeypatch):
+    """Фоновая обработка закрывает соединение, а тест выполняется
+    в транзакции, которую закрывать нельзя."""
+    monkeypatch.setattr(images, 'close_old_connections', lambda: None)
+
+
+def get_renditions(recipe):
+    return Recipes.objects.values(*RENDITIONS).get(pk=recipe.pk)
+
+
+def test_make_renditions(dataset):
+    make_renditions(dataset.recipe.pk)
+
+    for name in get_renditions(dataset.recipe).values():
+        assert name and default_storage.exists(name)
+
+
+def test_make_renditions_missing_source(dataset):
+    """sorl-thumbnail не сообщает об ошибке, копии не сохраняются."""
+    make_renditions(dataset.recipe.pk)
+    Recipes.objects.filter(pk=dataset.recipe.pk).update(
+        image='recipes/images/missing.png')
+
+    make_renditions(dataset.recipe.pk)
+
+    assert set(get_renditions(dataset.recipe).values()) == {''}
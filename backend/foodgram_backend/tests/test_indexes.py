@@ -0,0 +1,36 @@
+import pytest
+from django.db import connection
+
+from recipes.models import Favorites, Recipes, ShoppingList
+
+
+def feed(user):
+    return Recipes.objects.with_related().with_user_flags(
+        user).order_by('-pub_date', '-id')[:6]
+
+
+def favorites(user):
+    return Favorites.objects.filter(user=user).values('recipe_id')
+
+
+def shopping_list(user):
+    return ShoppingList.objects.filter(user=user).values('recipe_id')
+
+
+@pytest.mark.parametrize('queryset, indexes', [
+    (feed, {'recipes_pub_date_id_idx', 'favorites_user_recipe_idx',
+            'shopping_list_user_recipe_idx'}),
+    (favorites, {'favorites_user_recipe_idx'}),
+    (shopping_list, {'shopping_list_user_recipe_idx'}),
+], ids=['feed', 'favorites', 'shopping_list'])
+def test_queries_use_indexes(dataset, queryset, indexes):
+    """Лента и подзапросы признаков is_favorited и is_in_shopping_cart
+    читают индексы, а не всю таблицу. На маленьком наборе данных
+    последовательное чтение дешевле, поэтому оно отключается
+    до конца транзакции теста."""
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    plan = queryset(dataset.user).explain()
+    assert 'Seq Scan' not in plan, plan
+    for index in indexes:
+        assert f' {index} ' in plan, plan
@@ -0,0 +1,134 @@
+import time
+
+import pytest
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from api.utils.ingredients_index import ingredients_index
+from recipes.models import Ingredients, RecipesIngredients
+
+# Размер набора -> параметры generate_dataset. Наборы отличаются
+# и количеством строк, и числом связанных объектов у каждой строки.
+SIZES = {
+    'small': {'users': 30, 'recipes': 60, 'ingredients': (2, 4),
+              'follows': 8, 'favorites': 10, 'carts': 4},
+    'large': {'users': 150, 'recipes': 600, 'ingredients': (8, 14),
+              'follows': 20, 'favorites': 30, 'carts': 12},
+}
+PAGE_SIZES = (6, 50)
+
+# Имя -> (адрес, число SQL-запросов). Число запросов не должно
+# зависеть ни от объема данных, ни от размера страницы.
+PAGED_ENDPOINTS = {
+    'recipes-list': ('/api/recipes/?limit={limit}', 6),
+    'recipes-list-cursor': (
+        '/api/recipes/?pagination=cursor&limit={limit}', 4),
+    'recipes-filter': (
+        '/api/recipes/?tags=breakfast&tags=lunch'
+        '&is_in_shopping_cart=1&limit={limit}', 5),
+    'recipes-search': ('/api/recipes/?search=рецепт&limit={limit}', 5),
+    'users-list': ('/api/users/?limit={limit}', 4),
+    'subscriptions': ('/api/users/subscriptions/?limit={limit}', 4),
+}
+ENDPOINTS = {
+    'recipes-detail': ('/api/recipes/{recipe}/', 4),
+    'users-me': ('/api/users/me/', 1),
+    'shopping-cart-txt': (
+        '/api/recipes/download_shopping_cart/?format=txt', 2),
+    'shopping-cart-csv': (
+        '/api/recipes/download_shopping_cart/?format=csv', 2),
+    'shopping-cart-pdf': (
+        '/api/recipes/download_shopping_cart/?format=pdf', 2),
+    'tags': ('/api/tags/', 2),
+    'ingredients-search': ('/api/ingredients/?name=сол', 2),
+}
+
+# PATCH рецепта: удаление, изменение и добавление ингредиентов
+# пакетами, одно обновление списков покупок на все корзины.
+RECIPE_UPDATE_QUERIES = 23
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(scope='module', params=SIZES)
+def budget_dataset(request, django_db_setup, django_db_blocker, seed):
+    """Набор данных одного размера на все тесты модуля. Создается
+    в транзакции, которая откатывается после тестов."""
+    with django_db_blocker.unblock(), transaction.atomic():
+        dataset = seed(f'budget_{request.param}', **SIZES[request.param])
+        dataset.size = request.param
+        yield dataset
+        transaction.set_rollback(True)
+
+
+@pytest.fixture
+def budget_client(budget_dataset):
+    client = APIClient()
+    client.force_authenticate(budget_dataset.user)
+    return client
+
+
+def measure(client, url, queries, django_assert_num_queries,
+            method='get', **kwargs):
+    """Выполняет запрос и проверяет число SQL-запросов. Кеши
+    количеств и индекс ингредиентов сбрасываются, чтобы выполнялись
+    все запросы эндпоинта. Возвращает замер для отчета."""
+    cache.clear()
+    ingredients_index.invalidate()
+    with django_assert_num_queries(queries) as context:
+        started = time.perf_counter()
+        response = getattr(client, method)(url, **kwargs)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        duration = time.perf_counter() - started
+    assert response.status_code == 200, url
+    return {
+        'queries': len(context.captured_queries),
+        'time_ms': round(duration * 1000, 1),
+    }
+
+
+@pytest.mark.parametrize('limit', PAGE_SIZES)
+@pytest.mark.parametrize('name', PAGED_ENDPOINTS)
+def test_paged_endpoint_query_budget(
+        name, limit, budget_dataset, budget_client,
+        django_assert_num_queries, query_budget_report):
+    url, queries = PAGED_ENDPOINTS[name]
+    query_budget_report[name][f'{budget_dataset.size}, limit={limit}'] = (
+        measure(budget_client, url.format(limit=limit), queries,
+                django_assert_num_queries))
+
+
+@pytest.mark.parametrize('name', ENDPOINTS)
+def test_endpoint_query_budget(
+        name, budget_dataset, budget_client,
+        django_assert_num_queries, query_budget_report):
+    url, queries = ENDPOINTS[name]
+    query_budget_report[name][budget_dataset.size] = measure(
+        budget_client, url.format(recipe=budget_dataset.recipe.pk),
+        queries, django_assert_num_queries)
+
+
+def test_recipe_update_query_budget(
+        budget_dataset, django_assert_num_queries, query_budget_report):
+    """Число запросов PATCH не зависит ни от числа ингредиентов,
+    ни от числа корзин с рецептом."""
+    recipe = budget_dataset.recipe
+    items = list(RecipesIngredients.objects.filter(
+        recipe_id=recipe).order_by('id'))
+    kept = items[:len(items) // 2]
+    added = Ingredients.objects.exclude(
+        recipesingredients__recipe_id=recipe).order_by('id')[:len(items)]
+    ingredients = [
+        {'id': item.ingredient_id_id, 'amount': item.amount + 1}
+        for item in kept
+    ] + [{'id': ingredient.id, 'amount': 10} for ingredient in added]
+    assert recipe.in_shopping_cart.exists()
+
+    client = APIClient()
+    client.force_authenticate(recipe.author)
+    query_budget_report['recipes-update'][budget_dataset.size] = measure(
+        client, f'/api/recipes/{recipe.pk}/', RECIPE_UPDATE_QUERIES,
+        django_assert_num_queries, method='patch',
+        data={'ingredients': ingredients}, format='json')
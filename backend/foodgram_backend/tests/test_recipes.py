@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorites, Recipes, ShoppingList
+
+
+def get_recipes(client, limit):
+    # Количество рецептов кешируется, сбрасываем кеш, чтобы оба
+    # запроса выполняли одинаковый набор SQL-запросов.
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(f'/api/recipes/?limit={limit}')
+    assert response.status_code == 200
+    return len(context.captured_queries), response.json()['results']
+
+
+def test_recipes_list_queries_do_not_depend_on_page_size(
+        dataset, user_client):
+    """Признаки избранного и корзины считаются аннотациями на всю
+    страницу, а не запросом на каждый рецепт."""
+    small_queries, small_page = get_recipes(user_client, 2)
+    large_queries, large_page = get_recipes(user_client, 30)
+
+    assert len(large_page) == 30
+    assert small_queries == large_queries
+
+
+def test_recipes_list_user_flags(dataset, user_client):
+    _, page = get_recipes(user_client, 40)
+    favorites = set(Favorites.objects.filter(
+        user=dataset.user).values_list('recipe_id', flat=True))
+    in_cart = set(ShoppingList.objects.filter(
+        user=dataset.user).values_list('recipe_id', flat=True))
+
+    assert in_cart
+    for recipe in page:
+        assert recipe['is_favorited'] == (recipe['id'] in favorites)
+        assert recipe['is_in_shopping_cart'] == (recipe['id'] in in_cart)
+
+
+def test_recipes_search_rejects_cursor_pagination(dataset, user_client):
+    """Курсор (pub_date, id) не совпадает с порядком по релевантности."""
+    response = user_client.get(
+        '/api/recipes/?search=рецепт&pagination=cursor')
+    assert response.status_code == 400
+    assert 'search' in response.json()
+
+    response = user_client.get('/api/recipes/?search=рецепт')
+    assert response.status_code == 200
+    assert response.json()['results']
+
+
+def test_recipe_save_updates_search_vector(dataset):
+    recipe = Recipes.objects.create(
+        name='Пирог с капустой', text='Тесто и капуста.',
+        author=dataset.user, cooking_time=30, image='recipes/images/x.png')
+    recipe.refresh_from_db()
+    assert recipe.search_vector
+
+    recipe.name = 'Пирог с яблоками'
+    recipe.save()
+    assert Recipes.objects.filter(
+        pk=recipe.pk, search_vector=SearchQuery(
+            'яблоками', config=settings.RECIPES_SEARCH_CONFIG)).exists()
+
+
+def test_recipes_search_ranks_missing_vector_last(dataset, user_client):
+    """Рецепт без поискового вектора, найденный только по сходству
+    названия, идет после совпадений по тексту."""
+    recipe = Recipes.objects.filter(
+        name__startswith='test').order_by('id').first()
+    Recipes.objects.filter(pk=recipe.pk).update(search_vector=None)
+
+    response = user_client.get('/api/recipes/?search=рецепт&limit=50')
+    ids = [item['id'] for item in response.json()['results']]
+    assert ids[-1] == recipe.pk
+    assert len(ids) > 1
@@ -0,0 +1,35 @@
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api.utils.ingredients_index import ingredients_index
+from recipes.models import Ingredients, Tags
+
+
+def test_ingredients_autocomplete_without_queries(
+        dataset, django_assert_num_queries):
+    """После первого запроса автодополнение обслуживается индексом
+    в памяти и закешированной версией таблицы, без базы."""
+    client = APIClient()
+    cache.clear()
+    ingredients_index.invalidate()
+    client.get('/api/ingredients/?name=сол')
+
+    with django_assert_num_queries(0):
+        response = client.get('/api/ingredients/?name=соль')
+    assert response.status_code == 200
+
+
+def test_reference_data_etag_changes_after_update(dataset):
+    client = APIClient()
+    cache.clear()
+    etag = client.get('/api/tags/')['ETag']
+    assert client.get('/api/tags/')['ETag'] == etag
+
+    Tags.objects.create(name='Перекус', slug='snack', color='#FFAA00')
+    response = client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+    etag = client.get('/api/ingredients/?name=соль')['ETag']
+    Ingredients.objects.create(name='соль гималайская', measurement_unit='кг')
+    assert client.get('/api/ingredients/?name=соль')['ETag'] != etag
@@ -0,0 +1,107 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from recipes.models import (Ingredients, Recipes, RecipesIngredients,
+                            ShoppingList, ShoppingListIngredients)
+
+
+def verify():
+    """Списки покупок совпадают с корзинами, иначе CommandError."""
+    call_command('rebuild_shopping_lists', verify=True, stdout=StringIO())
+
+
+@pytest.fixture
+def recipe(dataset):
+    """Рецепт из корзин нескольких пользователей."""
+    recipe = Recipes.objects.order_by('-in_carts_count', 'id').first()
+    assert recipe.in_shopping_cart.count() > 1
+    return recipe
+
+
+def test_shopping_list_add_and_delete(dataset):
+    recipe = Recipes.objects.exclude(
+        in_shopping_cart__user=dataset.user).order_by('id').first()
+    item = ShoppingList.objects.create(user=dataset.user, recipe_id=recipe)
+    verify()
+    item.delete()
+    verify()
+    ShoppingList.objects.filter(user=dataset.user).delete()
+    verify()
+    assert not ShoppingListIngredients.objects.filter(
+        user=dataset.user).exists()
+
+
+def test_recipe_ingredient_edits(recipe):
+    """Изменения, как из RecipesIngredientsInline в админке."""
+    item = RecipesIngredients.objects.filter(recipe_id=recipe).first()
+    item.amount += 7
+    item.save()
+    verify()
+
+    item.ingredient_id = Ingredients.objects.exclude(
+        recipesingredients__recipe_id=recipe).order_by('id').first()
+    item.save()
+    verify()
+
+    RecipesIngredients.objects.create(
+        recipe_id=recipe, amount=3,
+        ingredient_id=Ingredients.objects.exclude(
+            recipesingredients__recipe_id=recipe).order_by('id').first())
+    verify()
+
+    item.delete()
+    verify()
+
+
+def test_shopping_list_user_change(dataset, recipe):
+    item = recipe.in_shopping_cart.exclude(user=dataset.user).first()
+    ShoppingList.objects.filter(user=dataset.user, recipe_id=recipe).delete()
+    item.user = dataset.user
+    item.save()
+    verify()
+
+
+def test_recipe_delete(recipe):
+    recipe.delete()
+    verify()
+
+
+def test_author_delete(recipe):
+    """Каскад: автор -> его рецепты -> корзины других пользователей."""
+    assert recipe.in_shopping_cart.exclude(user=recipe.author).exists()
+    recipe.author.delete()
+    verify()
+
+
+def test_apply_adds_to_existing_rows(dataset):
+    ingredient = Ingredients.objects.order_by('id').first()
+    for _ in range(2):
+        ShoppingListIngredients.objects.apply(
+            [dataset.user.id], {ingredient.id: 5})
+    item = ShoppingListIngredients.objects.get(
+        user=dataset.user, ingredient_id=ingredient)
+    assert item.amount >= 10
+
+    ShoppingListIngredients.objects.apply(
+        [dataset.user.id], {ingredient.id: -item.amount})
+    assert not ShoppingListIngredients.objects.filter(
+        user=dataset.user, ingredient_id=ingredient).exists()
+
+
+def test_recipe_update_ingredients(recipe):
+    """PATCH удаляет, изменяет и добавляет ингредиенты пакетно."""
+    client = APIClient()
+    client.force_authenticate(recipe.author)
+    items = list(RecipesIngredients.objects.filter(
+        recipe_id=recipe).order_by('id'))
+    new = Ingredients.objects.exclude(
+        recipesingredients__recipe_id=recipe).order_by('id').first()
+    response = client.patch(f'/api/recipes/{recipe.id}/', {'ingredients': [
+        {'id': items[0].ingredient_id_id, 'amount': items[0].amount + 5},
+        {'id': new.id, 'amount': 4},
+    ]}, format='json')
+    assert response.status_code == 200, response.content
+    verify()
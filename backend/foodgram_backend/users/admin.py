@@ -13,6 +13,12 @@ class UserAdmin(admin.ModelAdmin):
         'first_name',
         'last_name',
         'role',
+        'recipes_count',
+        'followers_count',
+    )
+    readonly_fields = (
+        'recipes_count',
+        'followers_count',
     )
     list_editable = (
         'first_name',
@@ -24,7 +30,9 @@ class UserAdmin(admin.ModelAdmin):
         'email'
     )
     list_filter = (
-        'username',
-        'email',
+        'role',
+        'is_staff',
+        'is_active',
     )
+    show_full_result_count = False
     empty_value_display = settings.EMPTY_VALUE
@@ -0,0 +1,36 @@
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+token_cache = caches[settings.TOKEN_CACHE_ALIAS]
+
+
+def get_token_cache_key(key):
+    """Сам токен в ключ кеша не попадает."""
+    return 'token:' + sha256(key.encode()).hexdigest()
+
+
+def invalidate_tokens(keys):
+    token_cache.delete_many([get_token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, который хранит пользователя по токену
+    в кеше TOKEN_CACHE_ALIAS на TOKEN_CACHE_TTL секунд, чтобы не
+    выполнять запрос Token + User на каждый запрос к API.
+
+    Запись удаляется при выходе (удалении токена), смене пароля
+    и любом сохранении пользователя, см. users.signals. Если кеш
+    локальный для процесса, другие процессы сервера увидят выход
+    пользователя не позже чем через TOKEN_CACHE_TTL секунд."""
+
+    def authenticate_credentials(self, key):
+        cache_key = get_token_cache_key(key)
+        user = token_cache.get(cache_key)
+        if user is not None:
+            return user, self.get_model()(key=key, user=user)
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(cache_key, user, settings.TOKEN_CACHE_TTL)
+        return user, token
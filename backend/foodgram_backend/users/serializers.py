@@ -4,6 +4,7 @@ from rest_framework.fields import SerializerMethodField
 
 from recipes.models import Recipes
 from users.models import Follow, User
+from users.utils import get_recipes_limit, get_subscriptions
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -27,10 +28,7 @@ class CustomUserSerializer(UserSerializer):
                   "is_subscribed")
 
     def get_subscription(self, obj):
-        user = self.context["request"].user
-        if user.is_authenticated:
-            return Follow.objects.filter(user=user, author=obj).exists()
-        return False
+        return obj.id in get_subscriptions(self.context["request"])
 
 
 class FollowSerializer(serializers.ModelSerializer):
@@ -76,19 +74,18 @@ class FollowSerializer(serializers.ModelSerializer):
     def get_subscription(self, obj):
         """Возвращает True/False о подписке на автора рецепта
         пользователя, отправляющего запрос."""
-        user = self.context["request"].user
-        if user.is_authenticated:
-            return Follow.objects.filter(user=user, author=obj).exists()
-        return False
+        return obj.id in get_subscriptions(self.context["request"])
 
     def get_recipes(self, obj):
         """Получает рецепты автора, на которого оформлена подписка
-        (c учетом лимита)."""
+        (c учетом лимита). Для страницы подписок рецепты всех авторов
+        заранее загружены во вьюсете и переданы в context['recipes']."""
         request = self.context.get('request')
-        recipes = Recipes.objects.filter(author=obj)
-        recipes_limit = request.GET.get('recipes_limit')
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
+        if 'recipes' in self.context:
+            recipes = self.context['recipes'].get(obj.id, [])
+        else:
+            recipes = Recipes.objects.limited_per_author(
+                [obj], get_recipes_limit(request))
         serializer = self.get_major_serialiser()(
             recipes,
             context={'request': request},
@@ -98,5 +95,5 @@ class FollowSerializer(serializers.ModelSerializer):
 
     def get_recipes_count(self, obj):
         """Получает количество рецептов автора,
-        на которого оформлена подписка."""
-        return Recipes.objects.filter(author=obj).count()
+        на которого оформлена подписка, из счетчика в модели."""
+        return obj.recipes_count
@@ -0,0 +1,39 @@
+from users.models import Follow
+
+
+def get_subscriptions(request):
+    """Возвращает множество id авторов, на которых подписан
+    пользователь, отправляющий запрос. Подписки читаются из базы
+    один раз и сохраняются в объекте запроса, поэтому все
+    сериализаторы одного ответа используют общий результат."""
+    user = request.user
+    if not user.is_authenticated:
+        return frozenset()
+    if not hasattr(request, '_subscriptions'):
+        request._subscriptions = frozenset(
+            Follow.objects.filter(user=user).values_list(
+                'author_id', flat=True))
+    return request._subscriptions
+
+
+async def aget_subscriptions(request):
+    """Асинхронный вариант get_subscriptions. Вызывается до
+    сериализации в асинхронных вьюхах, чтобы сериализаторы взяли
+    подписки из запроса, а не из базы."""
+    user = request.user
+    if not user.is_authenticated:
+        return frozenset()
+    if not hasattr(request, '_subscriptions'):
+        request._subscriptions = frozenset([
+            author_id async for author_id in Follow.objects.filter(
+                user=user).values_list('author_id', flat=True)])
+    return request._subscriptions
+
+
+def get_recipes_limit(request):
+    """Возвращает значение параметра recipes_limit или None,
+    если параметр не передан или не является числом."""
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit and recipes_limit.isdigit():
+        return int(recipes_limit)
+    return None
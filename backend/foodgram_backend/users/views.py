@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
@@ -5,18 +7,20 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from api.pagination import PageLimitPagination
+from api.pagination import CachedCountPagination
 from api.permissions import IsAuthorOrAdminOrReadOnly
+from recipes.models import Recipes
 from users.models import Follow, User
 from users.serializers import CustomUserSerializer, FollowSerializer
+from users.utils import get_recipes_limit
 
 
 class CustomUserViewSet(UserViewSet):
     """Создание пользователя и подписка на него."""
-    queryset = User.objects.all()
+    queryset = User.objects.order_by('id')
     serializer_class = CustomUserSerializer
     permission_classes = (IsAuthenticated,)
-    pagination_class = PageLimitPagination
+    pagination_class = CachedCountPagination
 
     @action(methods=['POST', 'DELETE', ],
             detail=True,)
@@ -47,20 +51,31 @@ class FollowViewSet(viewsets.ReadOnlyModelViewSet):
     """Получение списка подписчиков."""
     serializer_class = FollowSerializer
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
-    pagination_class = PageLimitPagination
+    pagination_class = CachedCountPagination
+    count_models = (Follow,)
 
     def get_queryset(self):
-        return User.objects.filter(following__user=self.request.user)
+        return User.objects.filter(
+            following__user=self.request.user
+        ).order_by('-following__id')
+
+    def list(self, request):
+        """Получает страницу авторов, на которых подписан пользователь.
+        Рецепты всех авторов страницы загружаются одним запросом."""
+        page = self.paginate_queryset(self.get_queryset())
+        recipes = defaultdict(list)
+        for recipe in Recipes.objects.limited_per_author(
+                page, get_recipes_limit(request)):
+            recipes[recipe.author_id].append(recipe)
+        serializer = self.get_serializer(
+            page,
+            many=True,
+            context={'request': request, 'recipes': recipes},
+        )
+        return self.get_paginated_response(serializer.data)
 
     @action(methods=['GET', ],
             detail=False,)
     def subscribtions(self, request):
         """Получает подписки пользователя, сделавшего запрос."""
-        if request.method == 'GET':
-            user = request.user
-            user_subscriptions = Follow.objects.filter(user=user)
-            page = self.paginate_queryset(user_subscriptions)
-            serializer = FollowSerializer(page, many=True,
-                                          context={'request': request})
-            return self.get_paginated_response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return self.list(request)